@@ -1,7 +1,9 @@
 from flask import Flask
 from app.routes import routes
+from app.utils.logging_setup import configure_logging
 
 def create_app():
+    configure_logging()
     app = Flask(__name__)
     app.register_blueprint(routes)  # ✅ Register routes
     return app
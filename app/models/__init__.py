@@ -3,4 +3,7 @@
 from .batch import Lote
 from .farmer import Farmer
 from .aviary import Aviario
+from .padron import PadronTable
+from .farm_state import FarmState
+from .projection import PopulationProjection, project_population
 
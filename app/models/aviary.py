@@ -1,12 +1,16 @@
 # app/models/aviary.py
+import logging
 import re
 from datetime import datetime, timedelta
 from app.utils.database import get_connection  
 
+logger = logging.getLogger(__name__)
+
 class Aviario:
     def __init__(self, avi_id, needs_disinfection=False):
         self.avi_id = avi_id
         self.avi_name = None
+        self.avi_blo_id = None
         self.avi_capacidad_ideal = None
         self.avi_fase = None
         #######################################
@@ -24,7 +28,7 @@ class Aviario:
         if self.needs_disinfection and self.date is not None:
             self.is_active = True  # Disinfection is an active process
             self.disinfection_due_date = self.date + timedelta(days=self.disinfection_period_days)
-            print(f"Aviary {self.avi_id} initialized with disinfection in progress until {self.disinfection_due_date}")
+            logger.debug("Aviary %s initialized with disinfection in progress until %s", self.avi_id, self.disinfection_due_date)
 
     def __repr__(self):
         return (f"Aviary(avi_id={self.avi_id}, avi_name={self.avi_name}, "
@@ -40,7 +44,7 @@ class Aviario:
         if self.needs_disinfection and self.disinfection_due_date is None:
             self.is_active = True
             self.disinfection_due_date = self.date + timedelta(days=self.disinfection_period_days)
-            print(f"Aviary {self.avi_id} disinfection initialized with date {self.date}, due {self.disinfection_due_date}")
+            logger.debug("Aviary %s disinfection initialized with date %s, due %s", self.avi_id, self.date, self.disinfection_due_date)
 
     def set_active(self):
         """
@@ -52,13 +56,13 @@ class Aviario:
                 self.needs_disinfection = False
                 self.disinfection_due_date = None
                 self.was_inactive = True
-                print(f"Aviary {self.avi_id} disinfection complete, ready for active state")
+                logger.debug("Aviary %s disinfection complete, ready for active state", self.avi_id)
             else:
                 raise ValueError(f"Aviary {self.avi_id} cannot be set active: disinfection in progress until {self.disinfection_due_date}")
         if not self.is_active:
             self.is_active = True
             self.was_inactive = False
-            print(f"Aviary {self.avi_id} set to active")
+            logger.debug("Aviary %s set to active", self.avi_id)
 
     def set_inactive(self):
         """
@@ -66,12 +70,12 @@ class Aviario:
         """
         if self.allocated_lote:  # Only schedule disinfection if a lote was present
             self.schedule_disinfection()
-            print(f"Aviary {self.avi_id} set inactive and scheduled for disinfection")
+            logger.debug("Aviary %s set inactive and scheduled for disinfection", self.avi_id)
         else:
             self.is_active = False
             self.needs_disinfection = False  # Ensure clean state if never occupied
             self.was_inactive = True
-            print(f"Aviary {self.avi_id} set inactive (no disinfection needed)")
+            logger.debug("Aviary %s set inactive (no disinfection needed)", self.avi_id)
 
     def schedule_disinfection(self):
         """
@@ -83,7 +87,7 @@ class Aviario:
         self.disinfection_due_date = self.date + timedelta(days=self.disinfection_period_days)
         self.is_active = True  # Disinfection is an active process
         self.was_inactive = False
-        print(f"Aviary {self.avi_id} scheduled for disinfection until {self.disinfection_due_date}")
+        logger.debug("Aviary %s scheduled for disinfection until %s", self.avi_id, self.disinfection_due_date)
 
     def check_disinfection_due(self):
         """
@@ -1,9 +1,14 @@
+import logging
 import re
 from datetime import datetime, timedelta
 from app.utils.database import get_connection  
+from app.utils.padron_cache import PadronCache
+from app.models.projection import project_population
+
+logger = logging.getLogger(__name__)
 
 class Lote:
-    def __init__(self, plote_raza_id, pad_id, plote_cantidad, plote_eprod=19):
+    def __init__(self, plote_raza_id, pad_id, plote_cantidad, plote_eprod=19, padron_cache=None):
         # Identidad
         self.plote_id = None
         self.plote_name = None
@@ -22,11 +27,14 @@ class Lote:
         self.plote_avi_id = None
         # Cantidad
         self.plote_cantidad = plote_cantidad
+        self.plote_cvtadia = None
         self.is_selling = False
         # Estado de producción 
         self.plote_fase = None
         # Patrones de produccion
+        self.padron_cache = padron_cache
         self.bio_patterns = None
+        self.bio_table = None
         self.plote_production = None
         self.plote_deaths = None
 
@@ -40,6 +48,12 @@ class Lote:
                 #f"bio_patterns={self.bio_patterns}
 
 
+    def identity(self):
+        """Static fields that tell this lote apart, used to ship FarmStates between processes"""
+        return (self.plote_id, self.plote_name, self.plote_raza_id, self.plote_pad_id, self.plote_eprod,
+                self.plote_fnac_a, self.plote_fnac_b, self.plote_fprod, self.plote_cvtadia,
+                getattr(self, "id_escenario", None))
+
     ############################ Functions that create identity for the Lote ###########################
     def _set_plote_id(self):
         """Fetch the maximum plote_id from the database"""
@@ -49,9 +63,9 @@ class Lote:
                 cursor.execute("SELECT MAX(plote_id) FROM m_prm_pro_lotes")
                 result = cursor.fetchone()
                 self.plote_id = (result[0] + 1) if result and result[0] is not None else 1
-                print(f"plote_id set to: {self.plote_id}")
+                logger.debug("plote_id set to: %s", self.plote_id)
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             raise
 
     def _set_plote_name(self):
@@ -78,64 +92,52 @@ class Lote:
                 lote_1 = second_addend + 1
                 lote_2 = second_addend + 2
                 self.plote_name = f"{lote_1}+{lote_2}"
-                print(f"Next plote_name: {self.plote_name}")
+                logger.debug("Next plote_name: %s", self.plote_name)
 
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             raise
 
-    def _set_plote_fnac(self):
-        """Set birth and production dates"""
+    def _set_plote_fnac(self, fnac=None):
+        """Set birth and production dates, using today when no simulation date is given"""
         try:
-            current_date = datetime.now()
-            self.plote_fnac_a = current_date.date()
+            current_date = fnac or datetime.now()
+            self.plote_fnac_a = current_date.date() if isinstance(current_date, datetime) else current_date
             self.plote_fnac_b = self.plote_fnac_a + timedelta(days=7)
             self.plote_fprod = self.plote_fnac_a + timedelta(days=self.plote_eprod * 7)
-            print(f"plote_fnac_a set to: {self.plote_fnac_a}")
-            print(f"plote_fnac_b set to: {self.plote_fnac_b}")
-            print(f"plote_fprod set to: {self.plote_fprod}")
+            logger.debug("plote_fnac_a set to: %s", self.plote_fnac_a)
+            logger.debug("plote_fnac_b set to: %s", self.plote_fnac_b)
+            logger.debug("plote_fprod set to: %s", self.plote_fprod)
         except Exception as e:
-            print(f"Error setting plote_fnac_a: {str(e)}")
+            logger.error("Error setting plote_fnac_a: %s", e)
             raise
     
     def fetch_bios(self):
-        """Fetch production pattern based on plote_pad_id"""
-        try:
-            with get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT pdet_edad, pdet_productividad, pdet_pmortd
-                    FROM m_prm_padron_detalle
-                    WHERE pdet_padron_id = ?
-                    ORDER BY pdet_edad ASC
-                """, (self.plote_pad_id,))
-                
-                rows = cursor.fetchall()
-                if rows:
-                    self.bio_patterns = [
-                        {
-                            "edad": row[0],
-                            "productividad": row[1],
-                            "mortalidad": row[2]
-                        }
-                        for row in rows
-                    ]
-                    print(f"Loaded {len(self.bio_patterns)} production patterns from plote_pad_id {self.plote_pad_id} for lote {self.plote_id}")
-                else:
-                    print(f"No production patterns found for plote_pad_id {self.plote_pad_id}")
-
-        except Exception as e:
-            print(f"Database error in fetching production patterns: {str(e)}")
-            raise 
-
-    def set_lote_instantiation(self, id_escenario):
-        """Initialize Lote instance"""
+        """Fetch production pattern based on plote_pad_id from the shared padron cache"""
+        if self.padron_cache is None:
+            self.padron_cache = PadronCache()
+        self.bio_patterns = self.padron_cache.get(self.plote_pad_id)
+        self.bio_table = self.padron_cache.table(self.plote_pad_id, self.plote_eprod)
+        if not self.bio_patterns:
+            logger.warning("No production patterns found for plote_pad_id %s", self.plote_pad_id)
+
+    def set_lote_instantiation(self, id_escenario, fnac=None, plote_id=None, plote_name=None):
+        """Initialize Lote instance, querying the next plote_id and plote_name unless they are given"""
         self.id_escenario = id_escenario
-        print(f"id_escenario set to: {self.id_escenario}")
-        self._set_plote_id()
-        self._set_plote_name()
-        self._set_plote_fnac()
+        logger.debug("id_escenario set to: %s", self.id_escenario)
+        if plote_id is None:
+            self._set_plote_id()
+        else:
+            self.plote_id = plote_id
+        if plote_name is None:
+            self._set_plote_name()
+        else:
+            self.plote_name = plote_name
+        self._set_plote_fnac(fnac)
         self.fetch_bios()
+        if fnac is not None:
+            self.plote_date = fnac
+            self.set_plote_age()
 
 
     ############################ Functions that happend once simulation runs ###########################
@@ -153,28 +155,14 @@ class Lote:
     def _compute_bios(self):
         """Compute both productivity and mortality for the current simulated time."""
         try:
-            if not self.bio_patterns:
-                print("No production patterns available for this lote.")
+            if not self.bio_table:
+                logger.debug("No production patterns available for this lote.")
                 return None, None  # Return None for both values if patterns are missing
-            # Use the current age in weeks
-            lote_age_weeks = self.plote_age_weeks
-            # Find the closest matching "edad" (in weeks)
-            closest_pattern = min(
-                self.bio_patterns,
-                key=lambda pattern: abs(pattern["edad"] - lote_age_weeks)
-            )
-            # Compute productivity and mortality
-            if self.plote_eprod > lote_age_weeks:
-                productivity = 0
-                mortality = closest_pattern["mortalidad"]
-            else:
-                productivity = closest_pattern["productividad"] / 100
-                mortality = closest_pattern["mortalidad"]
-
-            return productivity, mortality
+            # Closest "edad" and eprod cutoff are already folded into the week-indexed table
+            return self.bio_table.lookup(self.plote_age_weeks)
         
         except Exception as e:
-            print(f"Error computing productivity and mortality: {str(e)}")
+            logger.error("Error computing productivity and mortality: %s", e)
             return None, None
 
     def population_dynamics(self):
@@ -185,15 +173,25 @@ class Lote:
                 self.plote_deaths = round(self.plote_cantidad * mortality)
                 self.plote_production = round(self.plote_cantidad * productivity)
                 self.plote_cantidad -= self.plote_deaths
-                print(f"Population dynamics computed: {self.plote_production} produced, {self.plote_deaths} dead.")
+                logger.debug("Population dynamics computed: %s produced, %s dead.", self.plote_production, self.plote_deaths)
                 return self.plote_production, self.plote_deaths
             else:
-                print(f"No population left in lote {self.plote_id}")
+                logger.debug("No population left in lote %s", self.plote_id)
                 return 0, 0
         except Exception as e:
-            print(f"Error computing population dynamics: {str(e)}")
+            logger.error("Error computing population dynamics: %s", e)
             return
     
+    def project_population(self, days):
+        """Project `days` days of population_dynamics at once for a lote that remains in its aviary"""
+        if self.bio_table is None:
+            self.fetch_bios()
+        return project_population(self.bio_table, self.plote_age_days, self.plote_cantidad, days)
+
+    def production_between(self, a, b):
+        """Production of simulated days a..b-1 counted from the lote's current age and cantidad"""
+        return self.project_population(b).production_between(a, b)
+    
     def sell_population(self, cantidad=2500):
         """Sell a given amount of population"""
         try:
@@ -201,14 +199,15 @@ class Lote:
                 if cantidad > self.plote_cantidad:
                     cantidad = self.plote_cantidad
                     self.plote_cantidad -= cantidad
-                    print(f"{cantidad} population sold from lote {self.plote_id}")
+                    logger.debug("%s population sold from lote %s", cantidad, self.plote_id)
                     if self.plote_cantidad <= 0:
-                        print(f"No population to sell in lote {self.plote_id}")
+                        logger.debug("No population to sell in lote %s", self.plote_id)
                         return 0
                     else:
-                        return print(f"Remaining population in lote {self.plote_id}: {self.plote_cantidad}")
+                        logger.debug("Remaining population in lote %s: %s", self.plote_id, self.plote_cantidad)
+                        return
         except Exception as e:
-            print(f"Error selling population: {str(e)}")
+            logger.error("Error selling population: %s", e)
 
 
 
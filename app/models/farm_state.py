@@ -0,0 +1,140 @@
+# app/models/farm_state.py
+from collections import namedtuple
+
+# Dynamic fields of an Aviario, static ones (name, capacity, fase) stay on the shared object
+AviaryRecord = namedtuple("AviaryRecord", [
+    "avi_id", "allocated_lote", "is_active", "was_inactive", "needs_disinfection", "disinfection_due_date"
+])
+
+# Dynamic fields of a Lote, "lote" points to the shared object holding identity, dates and patterns
+LoteRecord = namedtuple("LoteRecord", [
+    "lote", "plote_id", "plote_avi_id", "plote_cantidad", "plote_fase", "is_selling",
+    "plote_age_days", "plote_age_weeks", "plote_production", "plote_deaths"
+])
+
+
+def _dynamic_order(record):
+    """Sort key of an AviaryRecord on everything but avi_id, None first"""
+    return tuple((value is not None, value) for value in record[1:])
+
+
+def canonical_labels(aviaries, aviary_classes):
+    """
+    Canonical relabelling of interchangeable aviaries, avi_id -> the class ID it is keyed as.
+
+    The records of each class are sorted by dynamic state and laid onto the class IDs in the
+    order of aviaries, see FarmState.canonical_key. Aviaries keeping their own ID are left out.
+    """
+    members = {}
+    for record in aviaries:
+        aviary_class = aviary_classes.get(record.avi_id)
+        if aviary_class is not None:
+            members.setdefault(aviary_class, []).append(record)
+    relabel = {}
+    for records in members.values():
+        ordered = sorted(records, key=_dynamic_order)
+        for record, canonical in zip(records, ordered):
+            if canonical.avi_id != record.avi_id:
+                relabel[canonical.avi_id] = record.avi_id
+    return relabel
+
+
+class FarmState:
+    """
+    Immutable, tuple-backed snapshot of the dynamic part of a Farmer.
+
+    Aviario and Lote objects are shared by every snapshot and only hold the static fields
+    that matter, Farmer.restore() writes a snapshot back onto them before a transition and
+    Farmer.snapshot() reads the result, so no DP state ever needs a deepcopy.
+    """
+    __slots__ = ("date", "aviaries", "lotes", "new_lote_map")
+
+    def __init__(self, date, aviaries, lotes, new_lote_map):
+        self.date = date
+        self.aviaries = aviaries
+        self.lotes = lotes
+        self.new_lote_map = new_lote_map
+
+    def __repr__(self):
+        return (f"FarmState(date={self.date}, aviaries={len(self.aviaries)}, "
+                f"lotes={len(self.lotes)}, new_lotes={len(self.new_lote_map)})")
+
+    def __eq__(self, other):
+        return (isinstance(other, FarmState) and self.date == other.date and self.aviaries == other.aviaries
+                and self.lotes == other.lotes and self.new_lote_map == other.new_lote_map)
+
+    def __hash__(self):
+        return hash((self.date, self.aviaries, self.lotes, self.new_lote_map))
+
+    def pack(self):
+        """Plain tuples with lote identities instead of Lote objects, cheap to pickle"""
+        lotes = tuple((record.lote.identity(),) + tuple(record[1:]) for record in self.lotes)
+        return self.date, tuple(tuple(record) for record in self.aviaries), lotes, self.new_lote_map
+
+    @classmethod
+    def unpack(cls, packed, lote_for_identity):
+        """Rebuild a FarmState from pack(), resolving lote identities with lote_for_identity"""
+        date, aviaries, lotes, new_lote_map = packed
+        return cls(
+            date,
+            tuple(AviaryRecord(*record) for record in aviaries),
+            tuple(LoteRecord(lote_for_identity(record[0]), *record[1:]) for record in lotes),
+            new_lote_map
+        )
+
+    def canonical_key(self, t, buy_window=14, aviary_classes=None):
+        """
+        Key of the physical farm configuration reached at time step t.
+
+        Two snapshots with the same key have the same future whatever actions led to them:
+        aviary allocations and disinfection dates, lote placements, populations and ages,
+        and the days left before the buy window opens again. Per-day outputs (production,
+        deaths) and the lote ordering are left out.
+
+        With aviary_classes (avi_id -> class, see services.symmetry.aviary_classes) the
+        aviaries of a class are relabelled in a canonical order first, so states that only
+        differ by which interchangeable aviary holds what share one key.
+        """
+        last_buy = self.last_buy()
+        buy_lock = max(0, last_buy + buy_window - t) if last_buy is not None else 0
+        aviaries, relabel = self._relabelled_aviaries(aviary_classes) if aviary_classes else (self.aviaries, None)
+        lotes = tuple(sorted((
+            (record.plote_id, relabel.get(record.plote_avi_id, record.plote_avi_id) if relabel else record.plote_avi_id,
+             record.plote_cantidad, record.plote_fase, record.is_selling, record.plote_age_days)
+            for record in self.lotes
+        ), key=lambda lote_key: lote_key[0]))
+        return aviaries, lotes, buy_lock
+
+    def _relabelled_aviaries(self, aviary_classes):
+        """Aviary records with each class sorted by dynamic state onto the class IDs, and the avi_id relabelling"""
+        relabel = canonical_labels(self.aviaries, aviary_classes)
+        if not relabel:
+            return self.aviaries, None
+        moved = {relabel[record.avi_id]: record for record in self.aviaries if record.avi_id in relabel}
+        return tuple(AviaryRecord(record.avi_id, *moved[record.avi_id][1:]) if record.avi_id in moved else record
+                     for record in self.aviaries), relabel
+
+    def last_buy(self):
+        """Time step of the most recent buy, or None"""
+        return max((map_key[0] for map_key, _ in self.new_lote_map), default=None)
+
+    def aviary(self, avi_id):
+        """Return the AviaryRecord of avi_id, or None"""
+        for record in self.aviaries:
+            if record.avi_id == avi_id:
+                return record
+        return None
+
+    def lote(self, plote_id):
+        """Return the LoteRecord of plote_id, or None"""
+        for record in self.lotes:
+            if record.plote_id == plote_id:
+                return record
+        return None
+
+    def new_lote(self, key, default=None):
+        """Look up the plote_id bought for a (t, aviary_id, "NEW_LOTE", "B") key"""
+        for map_key, plote_id in self.new_lote_map:
+            if map_key == key:
+                return plote_id
+        return default
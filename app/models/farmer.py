@@ -1,14 +1,73 @@
+import logging
+from bisect import bisect_left
 from app.models.batch import Lote
 from app.models.aviary import Aviario
+from app.models.farm_state import FarmState, AviaryRecord, LoteRecord
 from app.utils.database import get_connection
+from app.utils.padron_cache import PadronCache
+from app.utils.lote_allocator import LoteAllocator
+from app.utils.result_cache import rows_fingerprint
 from datetime import datetime, date
 
+logger = logging.getLogger(__name__)
+
 class Farmer:
     """Handles fetching and managing multiple Lote objects from the database"""
-    def __init__(self):
+    def __init__(self, padron_cache=None, lote_allocator=None):
         self.memo_aviaries = {}
         self.memo_lotes = {}
         self.new_lote_map = {}
+        self.padron_cache = padron_cache if padron_cache is not None else PadronCache()
+        self.lote_allocator = lote_allocator if lote_allocator is not None else LoteAllocator()
+        self.date = None
+        self.lote_registry = {}  # Lote.identity() -> shared Lote, for packed FarmStates
+        self.source_fingerprint = None  # Hash of the rows read by fetch_farm
+        self.aviary_classes = {}  # avi_id -> class of interchangeable aviaries, see services.symmetry
+        self.buy_days = None  # Time steps allowed to buy on, every one when None, see services.block_decomposer
+        # Lookup indexes, built on first use and kept up to date by restore and the Farmer
+        # methods that move lotes, see lotes_in_aviary and free_aviaries
+        self._lotes_by_aviary = None
+        self._free_by_phase = None
+        self._aviary_order = None
+        self._aviary_positions = None
+        # plote_id -> position in memo_lotes order. Lotes never leave memo_lotes and are bought
+        # in plote_id order, so every state lists them in the order they were first seen
+        self._lote_ranks = {}
+
+    AVIARY_COLUMNS = "avi_id, avi_name, avi_blo_id, avi_capacidad_ideal, avi_desf_est, avi_recria, avi_produccion, avi_predescarte"
+    LOTE_COLUMNS = ("plote_id, plote_name, plote_raza_id, plote_pad_id, id_escenario, plote_eprod, "
+                    "plote_fnac_a, plote_fnac_b, plote_fprod, plote_avi_id, plote_cantidad, plote_cvtadia")
+
+    def _add_aviary(self, aviary):
+        """Build an Aviario from a m_prm_aviarios row"""
+        self._aviary_order = None
+        AviarioX = Aviario(aviary.avi_id)
+        AviarioX.avi_name = aviary.avi_name
+        AviarioX.avi_blo_id = aviary.avi_blo_id
+        AviarioX.avi_capacidad_ideal = aviary.avi_capacidad_ideal
+        AviarioX.needs_disinfection = (aviary.avi_desf_est == 1)
+        fase_map = {
+            aviary.avi_recria: "recria",
+            aviary.avi_produccion: "produccion",
+            aviary.avi_predescarte: "predescarte"
+        }
+        AviarioX.avi_fase = fase_map.get(1, "unknown")
+        self.memo_aviaries[AviarioX.avi_id] = AviarioX
+        self.invalidate_indexes()
+
+    def _add_lote(self, lote):
+        """Build a Lote from a m_prm_pro_lotes row"""
+        LoteX = Lote(lote.plote_raza_id, lote.plote_pad_id, lote.plote_cantidad, padron_cache=self.padron_cache)
+        LoteX.plote_id = lote.plote_id
+        LoteX.plote_name = lote.plote_name
+        LoteX.plote_fnac_a = lote.plote_fnac_a
+        LoteX.plote_fnac_b = lote.plote_fnac_b
+        LoteX.plote_fprod = lote.plote_fprod
+        LoteX.plote_avi_id = lote.plote_avi_id
+        LoteX.plote_cvtadia = lote.plote_cvtadia
+        self.memo_lotes[LoteX.plote_id] = LoteX
+        self._lote_ranks.setdefault(LoteX.plote_id, len(self._lote_ranks))
+        self.invalidate_indexes()
 
     def fetch_aviaries(self, avi_ids):
         """Retrieve aviaries by avi_ids or by matching avi_blo_id with blo_id from m_prm_bloques"""
@@ -17,26 +76,16 @@ class Farmer:
                 cursor = conn.cursor()
                 if avi_ids:
                     placeholders = ",".join(["?" for _ in avi_ids])
-                    query = f"SELECT * FROM m_prm_aviarios WHERE avi_id IN ({placeholders})"
+                    query = f"SELECT {self.AVIARY_COLUMNS} FROM m_prm_aviarios WHERE avi_id IN ({placeholders})"
                     cursor.execute(query, avi_ids)
                 else:
                     return []
                 aviaries = cursor.fetchall()
                 for aviary in aviaries:
-                    AviarioX = Aviario(aviary.avi_id)
-                    AviarioX.avi_name = aviary.avi_name
-                    AviarioX.avi_capacidad_ideal = aviary.avi_capacidad_ideal
-                    AviarioX.needs_disinfection = (aviary.avi_desf_est == 1)
-                    fase_map = {
-                        aviary.avi_recria: "recria",
-                        aviary.avi_produccion: "produccion",
-                        aviary.avi_predescarte: "predescarte"
-                    }
-                    AviarioX.avi_fase = fase_map.get(1, "unknown")
-                    self.memo_aviaries[AviarioX.avi_id] = AviarioX
+                    self._add_aviary(aviary)
                 return self.memo_aviaries
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return self.memo_aviaries
 
     def fetch_lotes(self, plote_ids):
@@ -45,8 +94,7 @@ class Farmer:
             return []
         placeholders = ",".join(["?" for _ in plote_ids])
         query = f"""
-            SELECT plote_id, plote_name, plote_raza_id, plote_pad_id, id_escenario, plote_eprod, 
-            plote_fnac_a, plote_fnac_b, plote_fprod, plote_avi_id, plote_cantidad, plote_cvtadia
+            SELECT {self.LOTE_COLUMNS}
             FROM m_prm_pro_lotes 
             WHERE plote_id IN ({placeholders})
         """
@@ -56,20 +104,69 @@ class Farmer:
                 cursor.execute(query, plote_ids)
                 lotes = cursor.fetchall()
                 for lote in lotes:
-                    LoteX = Lote(lote.plote_raza_id, lote.plote_pad_id, lote.plote_cantidad)
-                    LoteX.plote_id = lote.plote_id
-                    LoteX.plote_name = lote.plote_name
-                    LoteX.plote_fnac_a = lote.plote_fnac_a
-                    LoteX.plote_fnac_b = lote.plote_fnac_b
-                    LoteX.plote_fprod = lote.plote_fprod
-                    LoteX.plote_avi_id = lote.plote_avi_id
-                    LoteX.plote_cvtadia = lote.plote_cvtadia
-                    self.memo_lotes[LoteX.plote_id] = LoteX
-                return self.memo_lotes
+                    self._add_lote(lote)
+            self.padron_cache.load([lote.plote_pad_id for lote in self.memo_lotes.values()])
+            return self.memo_lotes
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return []
-        
+
+    def fetch_farm(self, avi_ids, plote_ids, pad_ids=()):
+        """
+        Load aviaries, lotes, the padrones they reference and the lote allocator seed in one pass.
+
+        Every query runs on a single pooled connection with explicit columns, and the padron
+        detail rows are selected through the lotes' plote_pad_id, so startup costs the same
+        four statements whatever the number of aviaries and lotes.
+
+        Args:
+            avi_ids: Aviaries to simulate.
+            plote_ids: Lotes placed in them.
+            pad_ids: Extra padrones needed during the simulation, e.g. the one of bought lotes.
+
+        Returns:
+            The Farmer itself, with memo_aviaries, memo_lotes, compiled padron tables, a
+            seeded lote_allocator and the source_fingerprint of the rows read.
+        """
+        if not avi_ids or not plote_ids:
+            return self
+        avi_placeholders = ",".join(["?" for _ in avi_ids])
+        lote_placeholders = ",".join(["?" for _ in plote_ids])
+        pad_ids = sorted({pad_id for pad_id in pad_ids if pad_id is not None})
+        pad_filter = f" OR pdet_padron_id IN ({','.join(['?' for _ in pad_ids])})" if pad_ids else ""
+        try:
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT {self.AVIARY_COLUMNS} FROM m_prm_aviarios WHERE avi_id IN ({avi_placeholders})",
+                               list(avi_ids))
+                aviaries = cursor.fetchall()
+                cursor.execute(f"SELECT {self.LOTE_COLUMNS} FROM m_prm_pro_lotes WHERE plote_id IN ({lote_placeholders})",
+                               list(plote_ids))
+                lotes = cursor.fetchall()
+                cursor.execute(f"""
+                    SELECT pdet_padron_id, pdet_edad, pdet_productividad, pdet_pmortd
+                    FROM m_prm_padron_detalle
+                    WHERE pdet_padron_id IN (SELECT plote_pad_id FROM m_prm_pro_lotes WHERE plote_id IN ({lote_placeholders})){pad_filter}
+                    ORDER BY pdet_padron_id ASC, pdet_edad ASC
+                """, list(plote_ids) + pad_ids)
+                patterns = cursor.fetchall()
+                cursor.execute("SELECT plote_id, plote_name FROM m_prm_pro_lotes")
+                names = [(row[0], row[1]) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Database error: %s", e)
+            raise
+
+        self.source_fingerprint = rows_fingerprint(aviaries, lotes, patterns, names)
+        for aviary in aviaries:
+            self._add_aviary(aviary)
+        for lote in lotes:
+            self._add_lote(lote)
+        self.padron_cache.add_rows([lote.plote_pad_id for lote in lotes] + pad_ids, patterns)
+        self.lote_allocator.seed_from_rows(names)
+        for lote in self.memo_lotes.values():
+            lote.fetch_bios()
+        return self
+
     def buy_lote(self, raza_id, pad_id, cantidad):
         """Create a new Lote object and save it to the database using"""
         new_lote = Lote(raza_id, pad_id, cantidad)
@@ -84,6 +181,7 @@ class Farmer:
 
     def set_date(self, date):
         """Set the system date for all aviaries and lotes"""
+        self.date = date
         for aviary in self.memo_aviaries.values():
             aviary.set_date(date)
         for lote in self.memo_lotes.values():
@@ -93,9 +191,9 @@ class Farmer:
         """Fetch and update the dynamics for all lotes"""
         agg_production = 0
         for lote in self.memo_lotes.values():
-            #print representation of the lote
-            print(lote.__repr__())
-            lote.fetch_bios()
+            logger.debug("%r", lote)
+            if lote.bio_patterns is None:
+                lote.fetch_bios()
             dynamics = lote.population_dynamics()
             agg_production += dynamics[0]
 
@@ -108,33 +206,35 @@ class Farmer:
 
         if previous_aviary:
             previous_aviary.allocated_lote = None
+            self._set_free(previous_aviary, True)
             previous_aviary.set_inactive()  # Schedules disinfection and sets due date
-            print(f"Aviary {previous_aviary.avi_id} scheduled for disinfection")
+            logger.debug("Aviary %s scheduled for disinfection", previous_aviary.avi_id)
 
+        self._move_lote(lote, avi_id)
         lote.plote_avi_id = avi_id
         next_aviary.allocated_lote = lote_id
+        self._set_free(next_aviary, False)
         lote.plote_fase = next_aviary.avi_fase
         next_aviary.is_active = True
-        print(f"Lote {lote_id} allocated to aviary {avi_id} in phase {lote.plote_fase}")
+        logger.debug("Lote %s allocated to aviary %s in phase %s", lote_id, avi_id, lote.plote_fase)
 
     def find_aviary(self, fase, lote):
         available_aviaries = []
-        for aviary in self.memo_aviaries.values():
-            if aviary.avi_fase == fase and aviary.allocated_lote is None:
-                if aviary.needs_disinfection:
-                    if aviary.check_disinfection_due():
-                        aviary.needs_disinfection = False  # Disinfection complete
-                    else:
-                        print(f"Aviary {aviary.avi_id} is under disinfection until {aviary.disinfection_due_date}")
-                        continue
-                if aviary.is_active:
-                    print(f"Aviary {aviary.avi_id} is active, cannot assign lote {lote.plote_id}")
-                    continue
-                if lote.plote_cantidad > aviary.avi_capacidad_ideal:
-                    print(f"Lote {lote.plote_id} exceeds capacity of aviary {aviary.avi_id}")
+        for aviary in self.free_aviaries(fase):
+            if aviary.needs_disinfection:
+                if aviary.check_disinfection_due():
+                    aviary.needs_disinfection = False  # Disinfection complete
+                else:
+                    logger.debug("Aviary %s is under disinfection until %s", aviary.avi_id, aviary.disinfection_due_date)
                     continue
-                available_aviaries.append(aviary.avi_id)
-        print(f"Available aviaries for {fase}: {available_aviaries}")
+            if aviary.is_active:
+                logger.debug("Aviary %s is active, cannot assign lote %s", aviary.avi_id, lote.plote_id)
+                continue
+            if lote.plote_cantidad > aviary.avi_capacidad_ideal:
+                logger.debug("Lote %s exceeds capacity of aviary %s", lote.plote_id, aviary.avi_id)
+                continue
+            available_aviaries.append(aviary.avi_id)
+        logger.debug("Available aviaries for %s: %s", fase, available_aviaries)
         return available_aviaries
     
     def transfer_lote(self, lote_id):
@@ -155,21 +255,197 @@ class Farmer:
                 self.allocate_lote(lote_id, target_aviary_id)
 
         if lote.plote_fase == "predescarte":
-            print(f"Selling population for lote {lote_id}")
+            logger.debug("Selling population for lote %s", lote_id)
             lote.sell_population()
             if lote.plote_cantidad <= 0:
                 aviary = self.memo_aviaries.get(lote.plote_avi_id)
                 if aviary:
                     aviary.allocated_lote = None
+                    self._set_free(aviary, True)
                     aviary.set_inactive()  # Trigger disinfection
-                    print(f"Aviary {aviary.avi_id} scheduled for disinfection after selling lote {lote_id}")
-            print(f"Lote {lote_id} sold")
+                    logger.debug("Aviary %s scheduled for disinfection after selling lote %s", aviary.avi_id, lote_id)
+            logger.debug("Lote %s sold", lote_id)
 
-    def buy_lote(self, raza_id, pad_id, cantidad=60000):
-        """Create a new Lote object by using set_lote_instantiation"""
-        new_lote = Lote(raza_id, pad_id, cantidad)
-        new_lote.set_lote_instantiation()
-        self.memo_lotes[new_lote.plote_id] = new_lote
+    def buy_lote(self, raza_id, pad_id, cantidad=60000, id_escenario=1):
+        """
+        Create a new Lote object born on the simulation date by using set_lote_instantiation.
+
+        plote_id and plote_name are virtual ones from the lote allocator, numbered by the lotes
+        already bought in this state, so no database query runs during the simulation. The same
+        purchase reached by another branch shares one Lote object, like loaded lotes do.
+        """
+        self.lote_allocator.load()
+        ordinal = sum(1 for plote_id in self.memo_lotes if self.lote_allocator.is_virtual(plote_id))
+        plote_id, plote_name = self.lote_allocator.allocate(ordinal)
+        new_lote = Lote(raza_id, pad_id, cantidad, padron_cache=self.padron_cache)
+        new_lote.set_lote_instantiation(id_escenario, self.date, plote_id, plote_name)
+        lote = self.lote_registry.setdefault(new_lote.identity(), new_lote)
+        if lote is not new_lote:
+            # Start the shared Lote over from the bought population
+            lote.plote_cantidad = cantidad
+            lote.plote_date = new_lote.plote_date
+            lote.plote_age_days = new_lote.plote_age_days
+            lote.plote_age_weeks = new_lote.plote_age_weeks
+            self._move_lote(lote, None)
+            lote.plote_avi_id = None
+            lote.plote_fase = None
+            lote.is_selling = False
+            lote.plote_production = None
+            lote.plote_deaths = None
+        self.memo_lotes[lote.plote_id] = lote
+        self._lote_ranks.setdefault(lote.plote_id, len(self._lote_ranks))
+        return lote
+
+    def snapshot(self):
+        """Capture the dynamic state of every aviary and lote as an immutable FarmState"""
+        aviaries = self.aviary_records()
+        lotes = tuple(
+            LoteRecord(lote, plote_id, lote.plote_avi_id, lote.plote_cantidad, lote.plote_fase, lote.is_selling,
+                       lote.plote_age_days, lote.plote_age_weeks, lote.plote_production, lote.plote_deaths)
+            for plote_id, lote in self.memo_lotes.items()
+        )
+        return FarmState(self.date, aviaries, lotes, tuple(self.new_lote_map.items()))
+
+    def aviary_records(self):
+        """AviaryRecords of the current dynamic state of every aviary, in memo_aviaries order"""
+        return tuple(
+            AviaryRecord(aviary.avi_id, aviary.allocated_lote, aviary.is_active, aviary.was_inactive,
+                         aviary.needs_disinfection, aviary.disinfection_due_date)
+            for aviary in self.memo_aviaries.values()
+        )
+
+    def restore(self, state):
+        """
+        Write a FarmState back onto the shared Aviario and Lote objects.
+
+        Built lookup indexes follow the difference with the current state rather than being
+        rebuilt: aviaries whose allocation changes enter or leave the free lists, lotes that
+        change aviary, enter memo_lotes or leave it move in the lote index. Successors of a
+        state only differ from it by a few actions, so little moves between restores.
+        """
+        self.date = state.date
+        free_index = self._free_by_phase is not None
+        for record in state.aviaries:
+            aviary = self.memo_aviaries[record.avi_id]
+            if free_index and (aviary.allocated_lote is None) != (record.allocated_lote is None):
+                self._set_free(aviary, record.allocated_lote is None)
+            aviary.date = state.date
+            aviary.allocated_lote = record.allocated_lote
+            aviary.is_active = record.is_active
+            aviary.was_inactive = record.was_inactive
+            aviary.needs_disinfection = record.needs_disinfection
+            aviary.disinfection_due_date = record.disinfection_due_date
+        previous = self.memo_lotes
+        lote_index = self._lotes_by_aviary is not None
+        self.memo_lotes = {}
+        for record in state.lotes:
+            lote = record.lote
+            self._lote_ranks.setdefault(record.plote_id, len(self._lote_ranks))
+            if lote_index and (previous.get(record.plote_id) is not lote or lote.plote_avi_id != record.plote_avi_id):
+                self._move_lote(lote, record.plote_avi_id)
+            lote.plote_date = state.date
+            lote.plote_avi_id = record.plote_avi_id
+            lote.plote_cantidad = record.plote_cantidad
+            lote.plote_fase = record.plote_fase
+            lote.is_selling = record.is_selling
+            lote.plote_age_days = record.plote_age_days
+            lote.plote_age_weeks = record.plote_age_weeks
+            lote.plote_production = record.plote_production
+            lote.plote_deaths = record.plote_deaths
+            self.memo_lotes[record.plote_id] = lote
+        if lote_index:
+            for plote_id, lote in previous.items():
+                if self.memo_lotes.get(plote_id) is not lote:
+                    self._move_lote(lote, None)  # Left memo_lotes, or another purchase took its plote_id
+        self.new_lote_map = dict(state.new_lote_map)
+        return self
+
+    def pack_state(self, state):
+        """Pack a FarmState for another process, remembering its Lote objects by identity"""
+        for record in state.lotes:
+            self.lote_registry.setdefault(record.lote.identity(), record.lote)
+        return state.pack()
+
+    def unpack_state(self, packed):
+        """Rebuild a packed FarmState on this Farmer's shared Lote objects"""
+        return FarmState.unpack(packed, self.lote_for_identity)
+
+    def lote_for_identity(self, identity):
+        """Return the Lote with this identity, creating it on first sight"""
+        lote = self.lote_registry.get(identity)
+        if lote is None:
+            (plote_id, plote_name, plote_raza_id, plote_pad_id, plote_eprod,
+             plote_fnac_a, plote_fnac_b, plote_fprod, plote_cvtadia, id_escenario) = identity
+            lote = Lote(plote_raza_id, plote_pad_id, 0, plote_eprod, padron_cache=self.padron_cache)
+            lote.plote_id = plote_id
+            lote.plote_name = plote_name
+            lote.plote_fnac_a = plote_fnac_a
+            lote.plote_fnac_b = plote_fnac_b
+            lote.plote_fprod = plote_fprod
+            lote.plote_cvtadia = plote_cvtadia
+            if id_escenario is not None:
+                lote.id_escenario = id_escenario
+            lote.fetch_bios()
+            self.lote_registry[identity] = lote
+        return lote
+
+    def invalidate_indexes(self):
+        """Drop the lookup indexes after lotes or allocations changed outside of the Farmer methods"""
+        self._lotes_by_aviary = None
+        self._free_by_phase = None
+
+    def _build_indexes(self):
+        lotes_by_aviary = {}
+        for lote in self.memo_lotes.values():
+            if lote.plote_avi_id is not None:
+                lotes_by_aviary.setdefault(lote.plote_avi_id, []).append(lote)
+        if self._aviary_order is None or len(self._aviary_order) != len(self.memo_aviaries):
+            self._aviary_order = list(self.memo_aviaries.values())
+            self._aviary_positions = {aviary.avi_id: i for i, aviary in enumerate(self._aviary_order)}
+        free_by_phase = {}
+        for position, aviary in enumerate(self._aviary_order):
+            if aviary.allocated_lote is None:
+                free_by_phase.setdefault(aviary.avi_fase, []).append(position)
+        self._lotes_by_aviary = lotes_by_aviary
+        self._free_by_phase = free_by_phase
+
+    def lotes_in_aviary(self, avi_id):
+        """Lotes whose plote_avi_id is avi_id, in memo_lotes order"""
+        if self._lotes_by_aviary is None:
+            self._build_indexes()
+        return self._lotes_by_aviary.get(avi_id, ())
+
+    def free_aviaries(self, fase):
+        """Aviaries of a phase without an allocated lote, in memo_aviaries order"""
+        if self._free_by_phase is None:
+            self._build_indexes()
+        return [self._aviary_order[position] for position in self._free_by_phase.get(fase, ())]
+
+    def _move_lote(self, lote, avi_id):
+        """Update the lote index before lote.plote_avi_id changes to avi_id"""
+        if self._lotes_by_aviary is None:
+            return
+        previous = self._lotes_by_aviary.get(lote.plote_avi_id)
+        if previous and any(placed is lote for placed in previous):
+            previous[:] = [placed for placed in previous if placed is not lote]
+        if avi_id is not None:
+            placed = self._lotes_by_aviary.setdefault(avi_id, [])
+            placed.append(lote)
+            if len(placed) > 1:
+                placed.sort(key=lambda placed_lote: self._lote_ranks[placed_lote.plote_id])
+
+    def _set_free(self, aviary, free):
+        """Update the free aviary index after aviary.allocated_lote changed"""
+        if self._free_by_phase is None:
+            return
+        positions = self._free_by_phase.setdefault(aviary.avi_fase, [])
+        position = self._aviary_positions[aviary.avi_id]
+        i = bisect_left(positions, position)
+        present = i < len(positions) and positions[i] == position
+        if free and not present:
+            positions.insert(i, position)
+        elif not free and present:
+            del positions[i]
 
     def reset_new_lote_map(self):
         """Reset the new_lote_map to an empty dictionary"""
@@ -0,0 +1,52 @@
+# app/models/padron.py
+
+
+class PadronTable:
+    """
+    Productivity and mortality curves of a padron compiled into dense week-indexed tuples.
+
+    Index w holds the values of the pattern whose "edad" is closest to w weeks (first one on
+    ties, same rule as a min() scan over the ordered rows), with productivity already divided
+    by 100 and zeroed below plote_eprod. Ages outside the table are clamped to its ends.
+    """
+    __slots__ = ("pad_id", "plote_eprod", "productividad", "mortalidad", "projections")
+
+    def __init__(self, pad_id, bio_patterns, plote_eprod=19):
+        self.pad_id = pad_id
+        self.plote_eprod = plote_eprod
+        productividad = []
+        mortalidad = []
+        if bio_patterns:
+            # Cover the last edad and the eprod cutoff so clamped ages keep both rules
+            last_week = max(0, plote_eprod, int(-(-max(pattern["edad"] for pattern in bio_patterns) // 1)))
+            for week in range(last_week + 1):
+                closest_pattern = min(bio_patterns, key=lambda pattern: abs(pattern["edad"] - week))
+                productividad.append(0 if plote_eprod > week else closest_pattern["productividad"] / 100)
+                mortalidad.append(closest_pattern["mortalidad"])
+        self.productividad = tuple(productividad)
+        self.mortalidad = tuple(mortalidad)
+        self.projections = {}  # Memo of models.projection.project_population
+
+    def __repr__(self):
+        return f"PadronTable(pad_id={self.pad_id}, plote_eprod={self.plote_eprod}, weeks={len(self.mortalidad)})"
+
+    def __deepcopy__(self, memo):
+        # Compiled tables are immutable and shared by every lote of the same padron
+        return self
+
+    def __len__(self):
+        return len(self.mortalidad)
+
+    def index(self, age_weeks):
+        """Clamp an age in weeks to a valid table index"""
+        if age_weeks <= 0:
+            return 0
+        last = len(self.mortalidad) - 1
+        return age_weeks if age_weeks < last else last
+
+    def lookup(self, age_weeks):
+        """Return (productivity, mortality) for an age in weeks"""
+        i = self.index(age_weeks)
+        if age_weeks < 0 <= self.plote_eprod:
+            return 0, self.mortalidad[i]  # Not born yet, always below the eprod cutoff
+        return self.productividad[i], self.mortalidad[i]
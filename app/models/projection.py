@@ -0,0 +1,97 @@
+# app/models/projection.py
+from app.models.padron import PadronTable
+
+MAX_MEMO_PROJECTIONS = 100000
+
+
+class PopulationProjection:
+    """
+    Day by day population of a lote that just remains in its aviary, from a starting age and cantidad.
+
+    Follows Lote.population_dynamics exactly (deaths and production rounded every day, nothing
+    happens once the population is gone) and keeps prefix sums, so the production or deaths
+    between two days are two reads. Day k is the k-th simulated day, starting at 0.
+    """
+    __slots__ = ("padron_table", "age_days", "cantidad", "_cantidades", "_production", "_deaths",
+                 "_production_prefix", "_deaths_prefix")
+
+    def __init__(self, padron_table: PadronTable, age_days: int, cantidad: int):
+        self.padron_table = padron_table
+        self.age_days = age_days
+        self.cantidad = cantidad
+        self._cantidades = [cantidad]  # Population before day k
+        self._production = []  # None on days without population
+        self._deaths = []
+        self._production_prefix = [0]
+        self._deaths_prefix = [0]
+
+    def __repr__(self):
+        return (f"PopulationProjection(pad_id={self.padron_table.pad_id}, age_days={self.age_days}, "
+                f"cantidad={self.cantidad}, days={len(self._production)})")
+
+    def __len__(self):
+        return len(self._production)
+
+    def extend_to(self, days):
+        """Project up to `days` days, reusing the days already computed"""
+        cantidad = self._cantidades[-1]
+        for k in range(len(self._production), days):
+            if cantidad > 0:
+                productivity, mortality = self.padron_table.lookup(round((self.age_days + k) / 7))
+                deaths = round(cantidad * mortality)
+                production = round(cantidad * productivity)
+                cantidad -= deaths
+                self._production.append(production)
+                self._deaths.append(deaths)
+            else:
+                production = deaths = 0
+                self._production.append(None)
+                self._deaths.append(None)
+            self._cantidades.append(cantidad)
+            self._production_prefix.append(self._production_prefix[-1] + production)
+            self._deaths_prefix.append(self._deaths_prefix[-1] + deaths)
+        return self
+
+    def production_between(self, a, b):
+        """Production of days a..b-1"""
+        self.extend_to(b)
+        return self._production_prefix[b] - self._production_prefix[a]
+
+    def deaths_between(self, a, b):
+        """Deaths of days a..b-1"""
+        self.extend_to(b)
+        return self._deaths_prefix[b] - self._deaths_prefix[a]
+
+    def cantidad_after(self, days):
+        """Population left after `days` days"""
+        self.extend_to(days)
+        return self._cantidades[days]
+
+    def day(self, k):
+        """(production, deaths) of day k, None for both when the lote had no population left"""
+        self.extend_to(k + 1)
+        return self._production[k], self._deaths[k]
+
+    def last_values(self, days):
+        """plote_production and plote_deaths a lote shows after `days` days, None if never updated"""
+        self.extend_to(days)
+        for k in range(days - 1, -1, -1):
+            if self._production[k] is not None:
+                return self._production[k], self._deaths[k]
+        return None
+
+
+def project_population(padron_table: PadronTable, age_days: int, cantidad: int, days: int = 0) -> PopulationProjection:
+    """
+    PopulationProjection memoized on the padron table by (starting age in days, starting cantidad),
+    so it lives as long as the PadronCache that compiled the table.
+    """
+    memo = padron_table.projections
+    key = (age_days, cantidad)
+    projection = memo.get(key)
+    if projection is None:
+        if len(memo) >= MAX_MEMO_PROJECTIONS:
+            memo.clear()
+        projection = PopulationProjection(padron_table, age_days, cantidad)
+        memo[key] = projection
+    return projection.extend_to(days)
@@ -1,5 +1,6 @@
-from flask import Blueprint, jsonify, request, render_template
-from app.services import dp_algo
+from flask import Blueprint, Response, jsonify, request, render_template
+from app.services import dp_algo, job_manager, validate_request
+from app.utils.metrics import registry as metrics_registry
 
 
 routes = Blueprint('routes', __name__)
@@ -12,4 +13,41 @@ def home():
 def optimize():
     return dp_algo()
 
+@routes.route('/optimize/jobs', methods=['POST'])
+def submit_optimize_job():
+    data = request.get_json(silent=True)
+    invalid = validate_request(data)
+    if invalid is not None:
+        error, status = invalid
+        return jsonify(error), status
+    job = job_manager.submit(data)
+    return jsonify(job.to_dict()), 202
 
+@routes.route('/optimize/jobs/<job_id>', methods=['GET'])
+def optimize_job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify(job.to_dict())
+
+@routes.route('/optimize/jobs/<job_id>/result', methods=['GET'])
+def optimize_job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    if not job.finished:
+        return jsonify(job.to_dict()), 202
+    if job.status == "cancelled":
+        return jsonify(job.to_dict()), 409
+    return jsonify(job.result if job.result is not None else {"error": job.error}), job.http_status or 500
+
+@routes.route('/optimize/jobs/<job_id>', methods=['DELETE'])
+def cancel_optimize_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify(job.to_dict())
+
+@routes.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(metrics_registry.to_prometheus(), mimetype='text/plain; version=0.0.4')
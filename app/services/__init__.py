@@ -1 +1,2 @@
-from .dp_algorithm import dp_algo
\ No newline at end of file
+from .dp_algorithm import dp_algo, run_optimization, validate_request
+from .job_manager import job_manager
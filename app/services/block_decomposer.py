@@ -0,0 +1,313 @@
+# app/services/block_decomposer.py
+import logging
+from concurrent.futures import ProcessPoolExecutor, wait
+from functools import partial
+from app.models import Farmer, FarmState
+from app.services.dynamics_kernel import DynamicsKernel
+from app.services.frontier_expander import ExpansionSettings
+from app.services.branch_and_bound import greedy_incumbent, seed_path
+from app.services.layer_search import search_layers
+from app.services.production_bound import ProductionBound
+from app.services.parallel_expander import MP_CONTEXT, static_payload, farmer_from_payload
+from app.services.plan_replayer import replay_plan
+from app.services.report_builder import build_solution_table
+from app.services.solution_retriever import retrieve_optimal_solution
+from app.services.state_generator import BUY_WINDOW_DAYS
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_POLL_SECONDS = 0.5  # How often block progress and cancellation are relayed from worker processes
+PHASE_ORDER = ("recria", "produccion", "predescarte")  # Farmer.transfer_lote moves lotes one phase along
+
+
+def missing_phases(farmer: Farmer, avi_ids) -> list:
+    """
+    Phases a block lacks for its lotes to go all the way through.
+
+    Lotes are only transferred inside their block, so a block with recria aviaries needs
+    produccion and predescarte ones as well, and one with produccion aviaries predescarte ones.
+    """
+    phases = {farmer.memo_aviaries[avi_id].avi_fase for avi_id in avi_ids}
+    stages = [PHASE_ORDER.index(phase) for phase in phases if phase in PHASE_ORDER]
+    if not stages:
+        return []
+    return [phase for phase in PHASE_ORDER[min(stages):] if phase not in phases]
+
+
+def aviary_blocks(farmer: Farmer, aviary_groups=None) -> list:
+    """
+    Splits the aviaries into the groups solved independently.
+
+    By default aviaries are grouped by avi_blo_id, and a block missing phases its lotes
+    need (see missing_phases) is merged with the nearest block having some of them, until
+    every block is complete or no other block can help.
+
+    Args:
+        farmer: Farmer with its aviaries loaded.
+        aviary_groups: Optional lists of avi_ids given by the caller, groups known not to
+            exchange lotes, used as given.
+
+    Returns:
+        A list of avi_id lists, in memo_aviaries order.
+
+    Raises:
+        ValueError: If the given groups repeat an aviary or leave one out.
+    """
+    if aviary_groups:
+        position = {avi_id: index for index, avi_id in enumerate(farmer.memo_aviaries)}
+        seen = set()
+        blocks = []
+        for group in aviary_groups:
+            avi_ids = [avi_id for avi_id in group if avi_id in position]
+            if seen.intersection(avi_ids):
+                raise ValueError(f"Aviaries {sorted(seen.intersection(avi_ids))} are in more than one group")
+            seen.update(avi_ids)
+            if avi_ids:
+                blocks.append(sorted(avi_ids, key=position.get))
+        missing = [avi_id for avi_id in farmer.memo_aviaries if avi_id not in seen]
+        if missing:
+            raise ValueError(f"Aviaries {missing} are in no group")
+        return blocks
+    by_block = {}
+    for aviary in farmer.memo_aviaries.values():
+        by_block.setdefault(aviary.avi_blo_id, []).append(aviary.avi_id)
+    return _merge_incomplete(farmer, list(by_block.values()))
+
+
+def _merge_incomplete(farmer: Farmer, blocks: list) -> list:
+    """Merges every block missing phases into the nearest block having some of them"""
+    position = {avi_id: index for index, avi_id in enumerate(farmer.memo_aviaries)}
+    index = 0
+    while index < len(blocks):
+        missing = missing_phases(farmer, blocks[index])
+        partners = [other for other, avi_ids in enumerate(blocks) if other != index
+                    and any(farmer.memo_aviaries[avi_id].avi_fase in missing for avi_id in avi_ids)]
+        if not partners:
+            index += 1
+            continue
+        partner = min(partners, key=lambda other: abs(other - index))
+        logger.info("Block of aviaries %s has no %s aviary, merging it with %s", blocks[index], missing, blocks[partner])
+        low, high = sorted((index, partner))
+        blocks[low] = sorted(blocks[low] + blocks[high], key=position.get)
+        del blocks[high]
+        index = low
+    return blocks
+
+
+def _block_state(initial_state: FarmState, avi_ids: set, with_unplaced: bool) -> FarmState:
+    """Part of the initial state in the aviaries of a block, lotes outside every aviary go with the first block"""
+    return FarmState(
+        initial_state.date,
+        tuple(record for record in initial_state.aviaries if record.avi_id in avi_ids),
+        tuple(record for record in initial_state.lotes
+              if record.plote_avi_id in avi_ids or (with_unplaced and record.plote_avi_id is None)),
+        initial_state.new_lote_map
+    )
+
+
+def solve_block(payload, packed_state, settings: ExpansionSettings, options: dict, progress=None,
+                cancel_event=None) -> dict:
+    """
+    Runs the DP on one block, in a worker process or in the caller's.
+
+    Args:
+        payload: static_payload of the block's aviaries, with its allowed buy days.
+        packed_state: Packed initial FarmState of the block.
+        settings: ExpansionSettings of the run.
+        options: "beam_width", "branch_and_bound" and "use_numpy" of the run.
+        progress: Optional callable receiving (t, projection_time, frontier_size) before each layer is expanded.
+        cancel_event: Optional event, OptimizationCancelled is raised at the next layer once set.
+
+    Returns:
+        A dict with the block's max_production, its optimal_solution_table rows, the
+        day_actions of its plan, the days it buys on and the [frontier, successors, merged,
+        pruned] counts of every expanded layer.
+    """
+    farmer = farmer_from_payload(payload)
+    initial_state = farmer.unpack_state(packed_state)
+    farmer.restore(initial_state)
+    kernel = DynamicsKernel(options["use_numpy"])
+    projection_time = settings.projection_time
+    bound = ProductionBound(farmer, projection_time, settings.pad_id, settings.buy_cantidad)
+
+    dp = [{} for _ in range(projection_time + 1)]
+    dp[0] = {tuple(): (0, initial_state, None, tuple())}
+    incumbent = None
+    seeded = set()
+    if options["branch_and_bound"]:
+        path, incumbent = greedy_incumbent(farmer, kernel, initial_state, settings, bound)
+        seed_path(dp, path, seeded)
+    layers = search_layers(farmer, kernel, dp, settings, options, bound, incumbent, seeded,
+                           progress=progress, cancel_event=cancel_event)["layers"]
+
+    max_production, state_sequence = retrieve_optimal_solution(dp, projection_time)
+    decisions = [(dp[layer][key][2][0] + 1, dp[layer][key][3], layer) for layer, key in state_sequence]
+    day_actions, day_states = replay_plan(farmer, initial_state, decisions, projection_time, settings.initial_date,
+                                          settings.epoch_step, settings.raza_id, settings.pad_id, settings.buy_cantidad)
+    return {
+        "max_production": max_production,
+        "rows": build_solution_table(day_actions, day_states, farmer.memo_aviaries, settings.initial_date),
+        "day_actions": day_actions,
+        "buy_days": sorted({t for t, system_state in enumerate(day_actions, start=1)
+                            for entry in system_state if entry[3] == "B"}),
+        "layers": layers,
+    }
+
+
+class _BlockProgress:
+    """Progress of the blocks as one run: their mean day and the summed frontier of the ones running"""
+    def __init__(self, blocks: int, projection_time: int, progress=None):
+        self.days = [0] * blocks
+        self.frontiers = [0] * blocks
+        self.projection_time = projection_time
+        self.progress = progress
+
+    def update(self, index, t, projection_time, frontier_size):
+        self.days[index] = t
+        self.frontiers[index] = frontier_size
+        if self.progress is not None:
+            self.progress(sum(self.days) // len(self.days), self.projection_time, sum(self.frontiers))
+
+    def finish(self, index):
+        self.update(index, self.projection_time, self.projection_time, 0)
+
+
+def _report(status, index, t, projection_time, frontier_size):
+    """Progress callable of a block solved in a worker process, read back by _solve_all"""
+    status[index] = (t, frontier_size)
+
+
+def _solve_all(jobs, settings, options, workers, tracker, cancel_event=None):
+    """
+    solve_block on every (payload, packed_state) job, concurrently when workers > 1.
+
+    Worker processes report their layers and watch for cancellation through a manager,
+    polled every PROGRESS_POLL_SECONDS, so a cancel stops every block at its next layer.
+    """
+    if workers > 1 and len(jobs) > 1:
+        with MP_CONTEXT.Manager() as manager, \
+                ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=MP_CONTEXT) as executor:
+            status = manager.dict()
+            stop = manager.Event()
+            futures = [executor.submit(solve_block, payload, packed_state, settings, options,
+                                       partial(_report, status, index), stop)
+                       for index, (payload, packed_state) in enumerate(jobs)]
+            running = set(futures)
+            while running:
+                finished, running = wait(running, timeout=PROGRESS_POLL_SECONDS)
+                if cancel_event is not None and cancel_event.is_set():
+                    stop.set()
+                for index, (t, frontier_size) in status.items():
+                    if futures[index] in running:
+                        tracker.update(index, t, settings.projection_time, frontier_size)
+                for index, future in enumerate(futures):
+                    if future in finished and future.exception() is None:
+                        tracker.finish(index)
+            return [future.result() for future in futures]
+    results = []
+    for index, (payload, packed_state) in enumerate(jobs):
+        results.append(solve_block(payload, packed_state, settings, options, partial(tracker.update, index), cancel_event))
+        tracker.finish(index)
+    return results
+
+
+def _conflicting_blocks(results, buy_window):
+    """
+    Blocks to re-solve so the buys of the others keep buy_window days apart farm-wide.
+
+    Buys are taken in date order, the block of a buy too close to an earlier kept one is
+    dropped with all its buys, until the remaining ones fit.
+    """
+    conflicting = set()
+    while True:
+        kept = []
+        clash = None
+        for day, index in sorted((day, index) for index, result in enumerate(results) if index not in conflicting
+                                 for day in result["buy_days"]):
+            if kept and day - kept[-1] < buy_window:
+                clash = index
+                break
+            kept.append(day)
+        if clash is None:
+            return sorted(conflicting), kept
+        conflicting.add(clash)
+
+
+def solve_by_blocks(farmer: Farmer, initial_state: FarmState, settings: ExpansionSettings, options: dict,
+                    workers: int = 1, aviary_groups=None, buy_window: int = BUY_WINDOW_DAYS, progress=None,
+                    cancel_event=None) -> dict:
+    """
+    Solves every block of the farm on its own and combines their plans.
+
+    Each block is a DP over its aviaries and the lotes placed in them, so lotes are only
+    transferred inside their block and the state space grows with the largest block instead
+    of the whole farm. Blocks are solved concurrently with up to `workers` processes. The
+    buy window is the only constraint they share: when buys of different blocks fall closer
+    than buy_window days, the blocks involved are solved again one after the other, only
+    allowed to buy on the days the plans already kept leave free.
+
+    Args:
+        farmer: Farmer after init_adjust, with its aviary classes.
+        initial_state: Its snapshot before the first simulated day.
+        settings: ExpansionSettings of the run.
+        options: "beam_width", "branch_and_bound" and "use_numpy" of the run.
+        workers: Processes solving blocks, 1 solves them in the caller's process.
+        aviary_groups: Optional explicit groups, see aviary_blocks.
+        buy_window: Minimum days between two buys of the farm.
+        progress: Optional callable receiving (t, projection_time, frontier_size) as blocks
+            advance, t being the mean day reached by the blocks and frontier_size the summed
+            frontier of the ones running.
+        cancel_event: Optional threading.Event, every block stops with OptimizationCancelled
+            at its next layer once set.
+
+    Returns:
+        A dict with the combined max_production, optimal_solution_table rows, day_actions
+        and layer counts summed over blocks, and one summary per block, with the
+        missing_phases of the blocks left incomplete.
+    """
+    blocks = aviary_blocks(farmer, aviary_groups)
+    incomplete = {index: missing_phases(farmer, avi_ids) for index, avi_ids in enumerate(blocks)}
+    for index, missing in incomplete.items():
+        if missing:
+            logger.warning("Block of aviaries %s has no %s aviary, its lotes cannot go past it", blocks[index], missing)
+    max_buys = settings.projection_time // buy_window + 1  # Virtual lote IDs reserved per block
+    jobs = []
+    for index, avi_ids in enumerate(blocks):
+        members = set(avi_ids)
+        packed_state = farmer.pack_state(_block_state(initial_state, members, index == 0))
+        jobs.append((static_payload(farmer, members, allocator_offset=index * max_buys), packed_state))
+    tracker = _BlockProgress(len(blocks), settings.projection_time, progress)
+    results = _solve_all(jobs, settings, options, workers, tracker, cancel_event)
+
+    conflicting, kept = _conflicting_blocks(results, buy_window)
+    for index in conflicting:
+        buy_days = frozenset(day for day in range(1, settings.projection_time + 1)
+                             if all(abs(day - kept_day) >= buy_window for kept_day in kept))
+        logger.info("Block %s buys too close to other blocks, solving it again on %s free days", index, len(buy_days))
+        payload, packed_state = jobs[index]
+        results[index] = solve_block(payload[:-1] + (buy_days,), packed_state, settings, options,
+                                     partial(tracker.update, index), cancel_event)
+        tracker.finish(index)
+        kept = sorted(kept + results[index]["buy_days"])
+
+    rows = sorted((row for result in results for row in result["rows"]), key=lambda row: (row["t"], row["aviary"]))
+    day_actions = [
+        tuple(sorted((entry for result in results for entry in result["day_actions"][t]), key=lambda entry: entry[1]))
+        for t in range(settings.projection_time)
+    ]
+    layers = {}
+    for result in results:
+        for t, counts in result["layers"].items():
+            layers[t] = [total + count for total, count in zip(layers.get(t, [0, 0, 0, 0]), counts)]
+    return {
+        "max_production": sum(result["max_production"] for result in results),
+        "rows": rows,
+        "day_actions": day_actions,
+        "layers": dict(sorted(layers.items())),
+        "blocks": [
+            {"avi_ids": avi_ids, "max_production": result["max_production"], "buy_days": result["buy_days"],
+             "states_expanded": sum(counts[0] for counts in result["layers"].values()), "resolved": index in conflicting,
+             "missing_phases": incomplete[index]}
+            for index, (avi_ids, result) in enumerate(zip(blocks, results))
+        ],
+    }
@@ -0,0 +1,80 @@
+# app/services/branch_and_bound.py
+from app.models import Farmer, FarmState
+from app.services.dynamics_kernel import DynamicsKernel
+from app.services.frontier_expander import expand_frontier, ExpansionSettings
+from app.services.production_bound import ProductionBound
+
+
+def greedy_incumbent(farmer: Farmer, kernel: DynamicsKernel, initial_state: FarmState, settings: ExpansionSettings,
+                     bound: ProductionBound, start: int = 0) -> tuple[list, int]:
+    """
+    Dives from the initial state to the horizon to get a complete feasible plan.
+
+    Each step takes the successor with the highest accumulated production plus optimistic
+    bound, expanded with the run's own settings, so the path is one the DP can reach and
+    its production a lower bound of the optimum.
+
+    Args:
+        farmer: Working Farmer, its state is overwritten.
+        kernel: DynamicsKernel used to advance each step.
+        initial_state: FarmState at the end of time step start.
+        settings: ExpansionSettings of the run, the dive stops at its projection_time.
+        bound: ProductionBound of the run.
+        start: Time step of initial_state, 0 before the first simulated day.
+
+    Returns:
+        A tuple (path, incumbent) where path holds one (t, state_key, production, farm_state,
+        system_state) per step, like seed_from_plan, and incumbent is the production of the
+        whole path after start.
+    """
+    path = []
+    t, state_key, production, farm_state = start, tuple(), 0, initial_state
+    while t < settings.projection_time:
+        successors = expand_frontier(farmer, kernel, [(state_key, production, farm_state)], t, settings)
+        if not successors:
+            raise ValueError(f"Branch and bound found no feasible decision at t={t + 1}")
+        _, production, farm_state, system_state, t, state_key = max(
+            successors, key=lambda successor: successor[1] + bound.remaining(successor[2], successor[4]))
+        path.append((t, state_key, production, farm_state, system_state))
+    return path, production
+
+
+def seed_path(dp: list, path: list, seeded: set, start: int = 0):
+    """
+    Writes a complete path, as returned by greedy_incumbent or seed_from_plan, into the DP table.
+
+    Entries already holding more production are left alone, every (t, state_key) of the path
+    is added to seeded so pruning keeps it. The path starts from the state with the empty
+    key at time step start, which is kept as well.
+    """
+    prev_ref = (start, tuple())
+    seeded.add(prev_ref)
+    for layer, state_key, production, farm_state, system_state in path:
+        if state_key not in dp[layer] or dp[layer][state_key][0] < production:
+            dp[layer][state_key] = (production, farm_state, prev_ref, system_state)
+        seeded.add((layer, state_key))
+        prev_ref = (layer, state_key)
+
+
+def prune_by_bound(layer: dict, t: int, bound: ProductionBound, incumbent, keep=frozenset()) -> tuple[dict, int]:
+    """
+    Discards the states of a DP layer that cannot beat a complete plan.
+
+    A state whose accumulated production plus optimistic bound does not exceed the
+    incumbent cannot lead to a better plan. Every (t, state_key) in keep is kept, so the
+    incumbent's path survives and the optimal production is still reached, though among
+    plans tying with it the incumbent's is returned.
+
+    Args:
+        layer: Maps canonical state keys to (production, farm_state, prev_key, system_state) tuples.
+        t: Time step of the states in layer.
+        bound: Optimistic bound on the production still achievable after time step t.
+        incumbent: Production of a complete feasible plan.
+        keep: (t, state_key) pairs never discarded, the ones of the incumbent's path.
+
+    Returns:
+        A tuple (kept_layer, pruned).
+    """
+    kept = {state_key: entry for state_key, entry in layer.items()
+            if (t, state_key) in keep or entry[0] + bound.remaining(entry[1], t) > incumbent}
+    return kept, len(layer) - len(kept)
@@ -1,151 +1,406 @@
 from app.models import Farmer
 from flask import jsonify, request
-from datetime import datetime, timedelta
-import copy
-from app.services.state_generator import generate_next_states
-from app.services.dynamics_evaluator import evaluate_dynamics
+from datetime import datetime
+import logging
+import os
+import uuid
+from app.services.dynamics_kernel import DynamicsKernel
+from app.services.frontier_expander import ExpansionSettings
+from app.services.parallel_expander import ParallelExpander
 from app.services.solution_retriever import retrieve_optimal_solution
 from app.services.input_initializer import init_adjust
+from app.services.report_builder import build_solution_table
+from app.services.production_bound import ProductionBound
+from app.services.branch_and_bound import greedy_incumbent, seed_path
+from app.services.layer_search import search_layers, OptimizationCancelled
+from app.services.plan_replayer import replay_plan
+from app.services.warm_start import plan_record, seed_from_plan, frozen_decisions
+from app.services.symmetry import aviary_classes
+from app.services.block_decomposer import solve_by_blocks
+from app.services.rolling_horizon import solve_rolling, ROLLING_TERMINAL_DAYS
+from app.utils.result_cache import ResultCache
+from app.utils.logging_setup import run_trace
+from app.utils.database import db_seconds
+from app.utils.metrics import RunMetrics, registry as metrics_registry
+
+logger = logging.getLogger(__name__)
+
+STEP_MODES = ("daily", "event")
+DP_WORKERS = int(os.environ.get("DP_WORKERS", "1"))
+TRACE_DIR = os.environ.get("TRACE_DIR", "traces")
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("RESULT_CACHE_SIZE", "64")),
+    directory=os.environ.get("RESULT_CACHE_DIR") or None
+)
+plan_store = ResultCache(  # Optimal plans by plan_id, seeds of warm-started runs
+    max_entries=int(os.environ.get("PLAN_STORE_SIZE", "256")),
+    directory=os.environ.get("PLAN_STORE_DIR") or None
+)
+
 
 def dp_algo():
     try:
-        data = request.get_json()
-        avi_ids = data.get('avi_ids')
-        lote_ids = data.get('lote_ids')
-        projection_time = data.get('projection_time')
-        initial_date = datetime.strptime(data.get('initial_date'), '%Y-%m-%d').date()
-        raza_id = data.get('raza_id', 1)
-        pad_id = data.get('pad_id', 1)
-        buy_cantidad = data.get('buy_cantidad', 60000)
-
-        farmer = Farmer()
-        farmer.fetch_aviaries(avi_ids)
-        farmer.fetch_lotes(lote_ids)
-        if not farmer.memo_aviaries or not farmer.memo_lotes:
-            return jsonify({"error": "No aviaries or lotes found"}), 400
-        print("Initial data fetched successfully")
-        farmer.set_date(initial_date)
-        farmer.reset_new_lote_map()  # Reset new_lote_map before simulation
-
-        farmer = init_adjust(farmer)
-
-
-        dp = [{} for _ in range(projection_time + 1)]
-        dp[0] = {tuple(): (0, farmer, None)}
-
-        for t in range(1, projection_time + 1):
-            current_date = initial_date + timedelta(days=t - 1)
-            next_dp = {}
-            for system_state, (production, farmer_state, prev_state) in dp[t - 1].items():
-                farmer_clone = copy.deepcopy(farmer_state)
-                farmer_clone.set_date(current_date)
-                for new_system_state in generate_next_states(farmer_clone, t):
-                    new_farmer = copy.deepcopy(farmer_clone)
-                    new_production, updated_farmer = evaluate_dynamics(new_system_state, new_farmer, raza_id, pad_id, buy_cantidad)
-                    total_production = production + new_production
-                    if new_system_state not in next_dp or next_dp[new_system_state][0] < total_production:
-                        next_dp[new_system_state] = (total_production, updated_farmer, system_state)
-            dp[t] = next_dp
-
-        max_production, state_sequence = retrieve_optimal_solution(dp, projection_time)
-        
-        # Build the table as a list of rows for JSON response
-        table_data = []
-        for t in range(1, projection_time + 1):
-            current_date = initial_date + timedelta(days=t - 1)
-            current_state = state_sequence[t - 1]
-            current_farmer = dp[t][current_state][1]
-            prev_farmer = dp[t-1][state_sequence[t-2]][1] if t > 1 else farmer
-
-            for (time, aviary_id, lote_id, action) in current_state:
-                if lote_id == "NEW_LOTE" and action == "B":
-                    lote_id = current_farmer.new_lote_map.get((t, aviary_id, "NEW_LOTE", "B"), "Unknown")
-
-                aviary_type = current_farmer.memo_aviaries[aviary_id].avi_fase if aviary_id in current_farmer.memo_aviaries else "Unknown"
-                if lote_id and lote_id != "Unknown":
-                    current_lote = current_farmer.memo_lotes.get(lote_id)
-                    prev_lote = prev_farmer.memo_lotes.get(lote_id) if t > 1 else None
-                    age_days = current_lote.plote_age_days if current_lote else "N/A"
-                    age_weeks = current_lote.plote_age_weeks if current_lote else "N/A"
-                    pop_before = current_lote.plote_cantidad if t == 1 else (prev_lote.plote_cantidad if prev_lote else current_lote.plote_cantidad)
-                    deaths = current_lote.plote_deaths if current_lote else 0
-                    pop_now = pop_before - deaths if current_lote else 0
-                    production = current_lote.plote_production if current_lote else 0
-                    pop_before = max(0, pop_before)
-                    deaths = max(0, deaths)
-                    pop_now = max(0, pop_now)
-                    production = max(0, production)
-                else:
-                    age_days = "N/A"
-                    age_weeks = "N/A"
-                    pop_before = "N/A"
-                    deaths = "N/A"
-                    pop_now = "N/A"
-                    production = "N/A"
-
-                if t == 1:
-                    detailed_action = f"Initial ({action})"
-                else:
-                    prev_state = state_sequence[t - 2]
-                    prev_action = action
-                    for (prev_t, prev_aviary, prev_lote, prev_action_candidate) in prev_state:
-                        if prev_lote == lote_id and prev_aviary == aviary_id:
-                            prev_action = prev_action_candidate
-                        elif prev_lote == lote_id and prev_action_candidate == "T":
-                            prev_action = f"T (from {prev_aviary})"
-                    detailed_action = prev_action
-
-                row = {
-                    "t": t,
-                    "date": str(current_date),
-                    "aviary": aviary_id,
-                    "aviary_type": aviary_type,
-                    "lote": str(lote_id) if lote_id else "None",
-                    "age_days": str(age_days),
-                    "age_weeks": str(age_weeks),
-                    "action": detailed_action,
-                    "pop_before": str(pop_before),
-                    "deaths": str(deaths),
-                    "pop_now": str(pop_now),
-                    "production": str(production)
-                }
-                table_data.append(row)
-
-        response = {
-            "max_production": max_production,
-            "optimal_solution_table": table_data
-        }
-
-        # Print for debugging (optional)
-        print(f"\nMaximum Production: {max_production}")
-        print("\nOptimal State Transition Table:")
-        print("-" * 150)
-        print(f"{'t':<5} {'date':<12} {'aviary':<8} {'aviary type':<12} {'lote':<8} {'age (days)':<12} {'age (weeks)':<12} {'action':<16} {'pop before':<12} {'deaths':<8} {'pop now':<12} {'production':<12}")
-        print("-" * 150)
-        for row in table_data:
-            print(f"{row['t']:<5} {row['date']:<12} {row['aviary']:<8} {row['aviary_type']:<12} {row['lote']:<8} {row['age_days']:<12} {row['age_weeks']:<12} {row['action']:<16} {row['pop_before']:<12} {row['deaths']:<8} {row['pop_now']:<12} {row['production']:<12}")
-        print("-" * 150)
-
-        return jsonify(response)
-
+        response, status = run_optimization(request.get_json(silent=True))
+        return jsonify(response), status
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.error("Error: %s", e)
         return jsonify({"error": str(e)}), 500
-        
-
-
-
-
-
-
-
-
 
 
+def run_optimization(data: dict, progress=None, cancel_event=None) -> tuple[dict, int]:
+    """
+    Runs the DP optimization of an /optimize request body, outside of any Flask request.
+
+    Args:
+        data: The request body. With "trace": true every DEBUG message of the run is written
+            to TRACE_DIR/<run_id>.log, returned as trace_file, with "metrics": true the
+            RunMetrics of the run are returned as metrics.
+        progress: Optional callable receiving (t, projection_time, frontier_size) before each layer is expanded.
+        cancel_event: Optional threading.Event, the run stops with OptimizationCancelled at the next layer once set.
+
+    Returns:
+        A tuple (response, status) with the JSON-serializable response and its HTTP status, 400
+        without running anything when validate_request rejects data.
+    """
+    invalid = validate_request(data)
+    if invalid is not None:
+        return invalid
+    run_id = uuid.uuid4().hex
+    trace_file = os.path.join(TRACE_DIR, f"{run_id}.log") if data.get('trace') else None
+    metrics = RunMetrics()
+    db_start = db_seconds()
+    try:
+        with run_trace(run_id, trace_file):
+            response, status = _run_optimization(data, progress, cancel_event, run_id, metrics)
+    except OptimizationCancelled:
+        metrics_registry.observe(metrics.finish(db_seconds() - db_start), "cancelled")
+        raise
+    except Exception:
+        metrics_registry.observe(metrics.finish(db_seconds() - db_start), "failed")
+        raise
+    metrics.finish(db_seconds() - db_start)
+    run_status = "failed" if status != 200 else "cache_hit" if response.get("result_cache") == "hit" else "ok"
+    metrics_registry.observe(metrics, run_status)
+    if trace_file is not None:
+        response["trace_file"] = trace_file
+    if data.get('metrics'):
+        response["metrics"] = metrics.to_dict()
+    return response, status
+
+
+def validate_request(data) -> tuple[dict, int] | None:
+    """400 response for an /optimize request body missing or malformed required parameters, None if it is valid"""
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object with the /optimize parameters"}, 400
+    for name in ('avi_ids', 'lote_ids'):
+        if not isinstance(data.get(name), list) or not data.get(name):
+            return {"error": f"{name} must be a non-empty list"}, 400
+    if not _positive_int(data.get('projection_time')):
+        return {"error": "projection_time must be a positive integer"}, 400
+    try:
+        datetime.strptime(data.get('initial_date'), '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return {"error": "initial_date must be a date formatted as YYYY-MM-DD"}, 400
+    if data.get('beam_width') is not None and not _positive_int(data.get('beam_width')):
+        return {"error": "beam_width must be a positive integer"}, 400
+    step_mode = data.get('step_mode', 'daily')
+    if step_mode not in STEP_MODES:
+        return {"error": f"Unknown step_mode {step_mode!r}, expected one of {', '.join(STEP_MODES)}"}, 400
+    return None
+
+
+def _positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def _run_optimization(data, progress, cancel_event, run_id, metrics):
+    avi_ids = data.get('avi_ids')
+    lote_ids = data.get('lote_ids')
+    projection_time = data.get('projection_time')
+    initial_date = datetime.strptime(data.get('initial_date'), '%Y-%m-%d').date()
+    raza_id = data.get('raza_id', 1)
+    pad_id = data.get('pad_id', 1)
+    buy_cantidad = data.get('buy_cantidad', 60000)
+    beam_width = data.get('beam_width')  # Keep only the top-K states per day
+    time_budget = data.get('time_budget')  # Seconds, the search turns greedy once exhausted
+    step_mode = data.get('step_mode', 'daily')  # "event" only branches on decision epochs
+    epoch_step = data.get('epoch_step', 7)  # Days an open choice is held in event mode
+    dynamics_kernel = data.get('dynamics_kernel')  # "numpy" or "python", NumPy when installed by default
+    workers = data.get('workers', DP_WORKERS)  # Processes expanding each layer, 1 runs in the request thread
+    warm_start = data.get('warm_start')  # plan_id of a previous run, or its plan, to seed this one
+    warm_start_mode = data.get('warm_start_mode', 'repair')  # "repair" keeps the previous decisions after replan_days, "exact" searches everything
+    replan_days = data.get('replan_days', 7)  # Days re-optimized freely in repair mode, besides the ones past the previous plan
+    symmetry_reduction = data.get('symmetry_reduction', True)  # Explore one of several interchangeable aviaries
+    branch_and_bound = data.get('branch_and_bound', False)  # Discard states whose bound cannot beat a complete plan
+    decomposition = data.get('decomposition')  # "block" solves every avi_blo_id block (or aviary_groups) on its own
+    rolling_window = data.get('rolling_window')  # Days per receding-horizon window, the whole horizon is one DP when unset
+
+    farmer = Farmer()
+    with metrics.phase("load"):
+        farmer.fetch_farm(avi_ids, lote_ids, [pad_id])  # pad_id of bought lotes, no queries during simulation
+    if not farmer.memo_aviaries or not farmer.memo_lotes:
+        return {"error": "No aviaries or lotes found"}, 400
+    logger.info("Initial data fetched successfully")
+    cache_key = result_cache.key(data, farmer.source_fingerprint) if ResultCache.cacheable(data) else None
+    if cache_key is not None:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Result cache hit for %s", cache_key)
+            cached["result_cache"] = "hit"
+            return cached, 200
+    farmer.set_date(initial_date)
+    farmer.reset_new_lote_map()  # Reset new_lote_map before simulation
+
+    with metrics.phase("load"):
+        farmer = init_adjust(farmer)
+    if symmetry_reduction:
+        farmer.aviary_classes = aviary_classes(farmer)
+    if decomposition is not None:
+        if decomposition != "block":
+            return {"error": f"Unknown decomposition {decomposition!r}, expected \"block\""}, 400
+        return _run_decomposed(data, farmer, run_id, metrics, cache_key, progress, cancel_event)
+    if rolling_window is not None:
+        return _run_rolling(data, farmer, run_id, metrics, cache_key, progress, cancel_event)
+
+
+    dp = [{} for _ in range(projection_time + 1)]
+    initial_state = farmer.snapshot()
+    dp[0] = {tuple(): (0, initial_state, None, tuple())}
+    bound = ProductionBound(farmer, projection_time, pad_id, buy_cantidad)
+    kernel = DynamicsKernel(None if dynamics_kernel is None else dynamics_kernel == "numpy")
+    settings = ExpansionSettings(projection_time, initial_date, step_mode, epoch_step, raza_id, pad_id, buy_cantidad)
+    incumbent = None
+    seeded = set()
+    warm_start_stats = None
+    if warm_start is not None:
+        plan = plan_store.get(warm_start) if isinstance(warm_start, str) else warm_start
+        warm_start_stats = {"plan_id": warm_start if isinstance(warm_start, str) else None, "found": plan is not None}
+        if plan is not None:
+            # The previous plan replayed on today's farm is a feasible path, seed it as a lower bound
+            with metrics.phase("warm_start"):
+                path, incumbent, followed_days = seed_from_plan(farmer, kernel, initial_state, plan, settings)
+            seed_path(dp, path, seeded)
+            warm_start_stats.update({"mode": warm_start_mode, "incumbent": incumbent, "followed_days": followed_days,
+                                     "pruned_states": 0})
+            if warm_start_mode == "repair":
+                settings = settings._replace(frozen=frozen_decisions(plan, initial_date, projection_time, replan_days))
+                warm_start_stats.update({"replan_days": replan_days, "frozen_days": len(settings.frozen)})
+            logger.info("Warm start: incumbent %s, %s days follow the previous plan", incumbent, followed_days)
+    branch_and_bound_stats = None
+    if branch_and_bound:
+        with metrics.phase("incumbent"):
+            path, dive_production = greedy_incumbent(farmer, kernel, initial_state, settings, bound)
+        branch_and_bound_stats = {"dive_production": dive_production, "pruned_states": 0}
+        if incumbent is None or dive_production > incumbent:
+            incumbent = dive_production
+            seed_path(dp, path, seeded)
+        logger.info("Branch and bound: dive reached %s, incumbent %s", dive_production, incumbent)
+    expander = ParallelExpander(farmer, kernel, settings, workers) if workers > 1 else None
+    options = {"beam_width": beam_width, "time_budget": time_budget}
+    try:
+        with metrics.phase("search"):
+            search = search_layers(farmer, kernel, dp, settings, options, bound, incumbent, seeded,
+                                   expander=expander, progress=progress, cancel_event=cancel_event, metrics=metrics)
+    finally:
+        if expander is not None:
+            expander.shutdown()
+    if branch_and_bound_stats is not None:
+        branch_and_bound_stats["pruned_states"] = search["bound_pruned"]
+    elif warm_start_stats is not None and incumbent is not None:
+        warm_start_stats["pruned_states"] = search["bound_pruned"]
+
+    with metrics.phase("replay"):
+        max_production, state_sequence = retrieve_optimal_solution(dp, projection_time)
+        decisions = []
+        for layer, key in state_sequence:
+            prev_t = dp[layer][key][2][0]
+            decisions.append((prev_t + 1, dp[layer][key][3], layer))
+        day_actions, day_states = replay_plan(farmer, initial_state, decisions, projection_time, initial_date,
+                                              epoch_step, raza_id, pad_id, buy_cantidad)
+    with metrics.phase("report"):
+        table_data = build_solution_table(day_actions, day_states, farmer.memo_aviaries, initial_date)
+        plan_id = run_id
+        plan_store.put(plan_id, plan_record(initial_date, projection_time, day_actions, max_production))
+
+    response = {
+        "max_production": max_production,
+        "optimal_solution_table": table_data,
+        "padron_cache": farmer.padron_cache.stats(),
+        "merged_states_per_day": search["merged"],
+        "step_mode": step_mode,
+        "dynamics_kernel": "numpy" if kernel.use_numpy else "python",
+        "decision_layers": sum(1 for layer in dp[1:] if layer),
+        "plan_id": plan_id,
+        "symmetry": {
+            "classes": len(set(farmer.aviary_classes.values())),
+            "aviaries": len(farmer.aviary_classes)
+        }
+    }
+    if warm_start_stats is not None:
+        response["warm_start"] = warm_start_stats
+    if branch_and_bound_stats is not None:
+        branch_and_bound_stats["incumbent"] = incumbent
+        response["branch_and_bound"] = branch_and_bound_stats
+    if beam_width or time_budget is not None:
+        best_bound = max(max_production, search["best_pruned_bound"])
+        response["search"] = {
+            "beam_width": beam_width,
+            "time_budget": time_budget,
+            "budget_exhausted_at": search["budget_exhausted_at"],
+            "dive_production": search["dive_production"],
+            "pruned_states": search["beam_pruned"],
+            "best_bound": best_bound,
+            "gap": best_bound - max_production,
+            "gap_pct": 100 * (best_bound - max_production) / best_bound if best_bound > 0 else 0
+        }
 
+    if cache_key is not None:
+        _cache_response(cache_key, response)
 
+    logger.info("Maximum Production: %s", max_production)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Optimal State Transition Table:")
+        logger.debug("%s", "-" * 150)
+        logger.debug("%-5s %-12s %-8s %-12s %-8s %-12s %-12s %-16s %-12s %-8s %-12s %-12s", 't', 'date', 'aviary', 'aviary type', 'lote', 'age (days)', 'age (weeks)', 'action', 'pop before', 'deaths', 'pop now', 'production')
+        logger.debug("%s", "-" * 150)
+        for row in table_data:
+            logger.debug("%-5s %-12s %-8s %-12s %-8s %-12s %-12s %-16s %-12s %-8s %-12s %-12s", row['t'], row['date'], row['aviary'], row['aviary_type'], row['lote'], row['age_days'], row['age_weeks'], row['action'], row['pop_before'], row['deaths'], row['pop_now'], row['production'])
+        logger.debug("%s", "-" * 150)
+
+    return response, 200
+
+
+def _cache_response(cache_key, response):
+    """
+    Stores a response in the result cache and marks it as a miss.
+
+    dynamics_kernel and decomposition.workers describe how this run was executed, which is
+    left out of the cache key, so they are not stored: a hit for a request asking for another
+    kernel or worker count would report settings it never ran with.
+    """
+    cached = {name: value for name, value in response.items() if name != "dynamics_kernel"}
+    if "decomposition" in cached:
+        cached["decomposition"] = {name: value for name, value in cached["decomposition"].items() if name != "workers"}
+    result_cache.put(cache_key, cached)
+    response["result_cache"] = "miss"
+
+
+def _sub_search(data):
+    """DynamicsKernel, ExpansionSettings and per-search options of the runs split into smaller DPs"""
+    dynamics_kernel = data.get('dynamics_kernel')
+    kernel = DynamicsKernel(None if dynamics_kernel is None else dynamics_kernel == "numpy")
+    settings = ExpansionSettings(data.get('projection_time'), datetime.strptime(data.get('initial_date'), '%Y-%m-%d').date(),
+                                 data.get('step_mode', 'daily'), data.get('epoch_step', 7), data.get('raza_id', 1),
+                                 data.get('pad_id', 1), data.get('buy_cantidad', 60000))
+    options = {"beam_width": data.get('beam_width'), "branch_and_bound": data.get('branch_and_bound', False),
+               "use_numpy": kernel.use_numpy}
+    return kernel, settings, options
+
+
+def _unsupported(data, mode, names):
+    """400 response naming the given request parameters a mode does not support, None if none is given"""
+    given = [name for name in names if data.get(name) is not None]
+    if not given:
+        return None
+    return {"error": f"{', '.join(given)} cannot be combined with {mode}"}, 400
+
+
+def _run_decomposed(data, farmer, run_id, metrics, cache_key, progress, cancel_event):
+    """
+    The /optimize run of a "decomposition": "block" request, see block_decomposer.solve_by_blocks.
+
+    workers is the number of blocks solved at once, each block is expanded in one process.
+    """
+    unsupported = _unsupported(data, "decomposition", ("time_budget", "warm_start", "rolling_window"))
+    if unsupported is not None:
+        return unsupported
+    kernel, settings, options = _sub_search(data)
+    projection_time, initial_date, step_mode = settings.projection_time, settings.initial_date, settings.step_mode
+    workers = data.get('workers', DP_WORKERS)
+
+    def block_progress(t, projection_time, frontier_size):
+        metrics.sample_memory()  # Block layers are only recorded once solved, sample memory while they are
+        if progress is not None:
+            progress(t, projection_time, frontier_size)
 
-        
+    try:
+        with metrics.phase("search"):
+            solution = solve_by_blocks(farmer, farmer.snapshot(), settings, options, workers, data.get('aviary_groups'),
+                                       progress=block_progress, cancel_event=cancel_event)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    for t, (frontier, successors, merged, pruned) in solution["layers"].items():
+        metrics.record_day(t, frontier, successors, merged, pruned, 0.0, {})  # Per-block timings stay in the workers
+    plan_store.put(run_id, plan_record(initial_date, projection_time, solution["day_actions"], solution["max_production"]))
+
+    response = {
+        "max_production": solution["max_production"],
+        "optimal_solution_table": solution["rows"],
+        "padron_cache": farmer.padron_cache.stats(),
+        "step_mode": step_mode,
+        "dynamics_kernel": "numpy" if kernel.use_numpy else "python",
+        "plan_id": run_id,
+        "decomposition": {"mode": "block", "workers": workers, "blocks": solution["blocks"]}
+    }
+    if cache_key is not None:
+        _cache_response(cache_key, response)
+    logger.info("Maximum Production: %s over %s blocks", solution["max_production"], len(solution["blocks"]))
+    return response, 200
+
+
+def _run_rolling(data, farmer, run_id, metrics, cache_key, progress, cancel_event):
+    """The /optimize run of a request with rolling_window, see rolling_horizon.solve_rolling"""
+    kernel, settings, options = _sub_search(data)
+    projection_time, initial_date = settings.projection_time, settings.initial_date
+    window = data.get('rolling_window')
+    step = data.get('rolling_step', 7)  # Days committed from each window
+    terminal_days = data.get('rolling_terminal_days', ROLLING_TERMINAL_DAYS)  # Days past a window its lotes are valued for
+    if window < 1 or not 1 <= step <= window:
+        return {"error": "rolling_window and rolling_step must satisfy 1 <= rolling_step <= rolling_window"}, 400
+    if terminal_days < 0:
+        return {"error": "rolling_terminal_days must not be negative"}, 400
+    unsupported = _unsupported(data, "rolling_window", ("time_budget", "warm_start"))
+    if unsupported is not None:
+        return unsupported
+    if data.get('workers', 1) > 1:
+        return {"error": "workers cannot be combined with rolling_window, windows are solved in the request's process"}, 400
+
+    with metrics.phase("search"):
+        solution = solve_rolling(farmer, kernel, farmer.snapshot(), settings, options, window, step, terminal_days,
+                                 progress, cancel_event, metrics)
+    with metrics.phase("report"):
+        table_data = build_solution_table(solution["day_actions"], solution["day_states"], farmer.memo_aviaries, initial_date)
+        plan_store.put(run_id, plan_record(initial_date, projection_time, solution["day_actions"], solution["max_production"]))
+
+    response = {
+        "max_production": solution["max_production"],
+        "optimal_solution_table": table_data,
+        "padron_cache": farmer.padron_cache.stats(),
+        "step_mode": settings.step_mode,
+        "dynamics_kernel": "numpy" if kernel.use_numpy else "python",
+        "plan_id": run_id,
+        "rolling_horizon": {"window": window, "step": step, "terminal_days": terminal_days,
+                            "windows": solution["windows"]}
+    }
+    if cache_key is not None:
+        _cache_response(cache_key, response)
+    logger.info("Maximum Production: %s over %s windows", solution["max_production"], len(solution["windows"]))
+    return response, 200
+    
+
+
+
+
+
+
+
+
+
+
+
+
+
+    
 
 
 
@@ -1,38 +1,74 @@
 # app/services/production_evaluator.py
+import logging
 from app.models import Farmer
+from app.models.farm_state import canonical_labels
+
+logger = logging.getLogger(__name__)
 
 def evaluate_dynamics(system_state, farmer: Farmer, raza_id: int = 24, pad_id: int = 231, buy_cantidad: int = 45000):
     """
     Evaluates the total production for a given system state by applying actions.
     """
 
-    print(f"Evaluating production for system state: {system_state}")
-    total_production = 0
+    logger.debug("Evaluating production for system state: %s", system_state)
+    apply_actions(system_state, farmer, raza_id, pad_id, buy_cantidad)
+
+    total_production = farmer.fetch_dynamics()
+    logger.debug("Production for system state %s: %s", system_state, total_production)
     
-    for (t, aviary_id, lote_id, action) in system_state:
+    return total_production, farmer
+
+
+def apply_actions(system_state, farmer: Farmer, raza_id: int = 24, pad_id: int = 231, buy_cantidad: int = 45000):
+    """
+    Applies the actions of a system state to the farmer without running the population dynamics.
+
+    Transfers and sales are applied in the canonical order of their aviaries, see _canonical_order.
+    """
+    for (t, aviary_id, lote_id, action) in _canonical_order(system_state, farmer):
             aviary = farmer.memo_aviaries.get(aviary_id)
             lote = farmer.memo_lotes.get(lote_id) if lote_id and lote_id != "NEW_LOTE" else None
             
             if action == "D":
                 aviary.schedule_disinfection()
-                print(f"Aviary {aviary_id} scheduled for disinfection")
+                logger.debug("Aviary %s scheduled for disinfection", aviary_id)
             elif action == "I":
                 aviary.set_inactive()
-                print(f"Aviary {aviary_id} inactivated")
+                logger.debug("Aviary %s inactivated", aviary_id)
             elif action == "B":
                 new_lote = farmer.buy_lote(raza_id, pad_id, buy_cantidad, id_escenario=1)
                 farmer.allocate_lote(new_lote.plote_id, aviary_id)
                 farmer.new_lote_map[(t, aviary_id, "NEW_LOTE", "B")] = new_lote.plote_id
-                print(f"Bought and allocated new lote {new_lote.plote_id} to aviary {aviary_id}")
+                logger.debug("Bought and allocated new lote %s to aviary %s", new_lote.plote_id, aviary_id)
             elif action == "R":
-                print(f"Lote {lote_id} remains in aviary {aviary_id}")
+                logger.debug("Lote %s remains in aviary %s", lote_id, aviary_id)
             elif action == "T" or action == "S":
-                print(f"Transferring/selling lote {lote_id} from aviary {aviary_id}")
+                logger.debug("Transferring/selling lote %s from aviary %s", lote_id, aviary_id)
                 farmer.transfer_lote(lote_id)
             else:
-                print(f"Unknown action {action}")
+                logger.debug("Unknown action %s", action)
 
-    total_production = farmer.fetch_dynamics()
-    print(f"Production for system state {system_state}: {total_production}")
-    
-    return total_production, farmer
\ No newline at end of file
+    return farmer
+
+
+def _canonical_order(system_state, farmer: Farmer):
+    """
+    The actions of a system state with its transfers and sales sorted by canonical aviary label.
+
+    Farmer.transfer_lote places a lote in the first free aviary of the next phase, so of two
+    lotes leaving on the same day the one applied first gets that aviary. States that only
+    differ by which interchangeable aviary holds which lote share a canonical key, ordering
+    their transfers by the label each aviary is keyed as rather than by its ID sends every
+    lote to the same aviary from any of them, so merging them stays exact.
+    """
+    if not farmer.aviary_classes:
+        return system_state
+    moves = [entry for entry in system_state if entry[3] in ("T", "S")]
+    if len(moves) < 2 or not any(entry[1] in farmer.aviary_classes for entry in moves):
+        return system_state
+    labels = canonical_labels(farmer.aviary_records(), farmer.aviary_classes)
+    if not labels:
+        return system_state
+    positions = {avi_id: position for position, avi_id in enumerate(farmer.memo_aviaries)}
+    ordered = iter(sorted(moves, key=lambda entry: positions.get(labels.get(entry[1], entry[1]), len(positions))))
+    return [next(ordered) if entry[3] in ("T", "S") else entry for entry in system_state]
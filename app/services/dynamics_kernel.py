@@ -0,0 +1,120 @@
+# app/services/dynamics_kernel.py
+from app.models import FarmState
+from app.models.farm_state import LoteRecord
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure Python path gives the same totals
+    np = None
+
+
+class DynamicsKernel:
+    """
+    Advances one day of population dynamics for every lote of a whole frontier at once.
+
+    Same rules as Lote.population_dynamics: deaths and production are rounded half to even
+    (Python round() and numpy.rint agree) and lotes without population are left untouched.
+    With NumPy, cantidad, age and padron index of every lote of every state go in flat
+    arrays and the padron tables are stacked in 2D arrays padded with their last value.
+    """
+    def __init__(self, use_numpy=None):
+        self.use_numpy = np is not None if use_numpy is None else bool(use_numpy) and np is not None
+        self._tables = []
+        self._table_rows = {}
+        self._productividad = None
+        self._mortalidad = None
+        self._lengths = None
+        self._unborn_idle = None
+
+    def _table_row(self, padron_table):
+        """Row of a PadronTable in the stacked arrays, rebuilding them when a new table shows up"""
+        key = (padron_table.pad_id, padron_table.plote_eprod)
+        row = self._table_rows.get(key)
+        if row is None:
+            row = len(self._tables)
+            self._tables.append(padron_table)
+            self._table_rows[key] = row
+            self._productividad = None
+        return row
+
+    def _stack_tables(self):
+        width = max(len(padron_table) for padron_table in self._tables)
+        self._productividad = np.array([
+            padron_table.productividad + padron_table.productividad[-1:] * (width - len(padron_table))
+            for padron_table in self._tables
+        ], dtype=np.float64)
+        self._mortalidad = np.array([
+            padron_table.mortalidad + padron_table.mortalidad[-1:] * (width - len(padron_table))
+            for padron_table in self._tables
+        ], dtype=np.float64)
+        self._lengths = np.array([len(padron_table) for padron_table in self._tables], dtype=np.int64)
+        self._unborn_idle = np.array([padron_table.plote_eprod >= 0 for padron_table in self._tables])
+
+    def advance(self, states: list) -> list:
+        """
+        Applies one day of mortality and production to every lote of every state.
+
+        Args:
+            states: FarmStates whose lotes already have the age of the simulated day.
+
+        Returns:
+            A list of (production, FarmState) pairs, one per input state.
+        """
+        for state in states:
+            for record in state.lotes:
+                if record.lote.bio_table is None:
+                    record.lote.fetch_bios()
+        if self.use_numpy:
+            return self._advance_numpy(states)
+        return self._advance_python(states)
+
+    def _advance_python(self, states):
+        results = []
+        for state in states:
+            production = 0
+            lotes = []
+            for record in state.lotes:
+                if record.plote_cantidad > 0:
+                    productivity, mortality = record.lote.bio_table.lookup(record.plote_age_weeks)
+                    deaths = round(record.plote_cantidad * mortality)
+                    lote_production = round(record.plote_cantidad * productivity)
+                    production += lote_production
+                    record = record._replace(plote_cantidad=record.plote_cantidad - deaths,
+                                             plote_production=lote_production, plote_deaths=deaths)
+                lotes.append(record)
+            results.append((production, FarmState(state.date, state.aviaries, tuple(lotes), state.new_lote_map)))
+        return results
+
+    def _advance_numpy(self, states):
+        alive = [record for state in states for record in state.lotes if record.plote_cantidad > 0]
+        rows = [self._table_row(record.lote.bio_table) for record in alive]
+        if self._productividad is None and self._tables:
+            self._stack_tables()
+
+        if alive:
+            rows = np.array(rows, dtype=np.int64)
+            cantidad = np.array([record.plote_cantidad for record in alive], dtype=np.int64)
+            weeks = np.array([record.plote_age_weeks for record in alive], dtype=np.int64)
+            columns = np.minimum(np.maximum(weeks, 0), self._lengths[rows] - 1)
+            productivity = self._productividad[rows, columns]
+            productivity = np.where((weeks < 0) & self._unborn_idle[rows], 0.0, productivity)
+            deaths = np.rint(cantidad * self._mortalidad[rows, columns]).astype(np.int64)
+            production = np.rint(cantidad * productivity).astype(np.int64)
+            remaining = (cantidad - deaths).tolist()
+            deaths = deaths.tolist()
+            production = production.tolist()
+        i = 0
+        results = []
+        for state in states:
+            state_production = 0
+            lotes = []
+            for record in state.lotes:
+                if record.plote_cantidad > 0:
+                    state_production += production[i]
+                    record = LoteRecord(record.lote, record.plote_id, record.plote_avi_id, remaining[i],
+                                        record.plote_fase, record.is_selling, record.plote_age_days,
+                                        record.plote_age_weeks, production[i], deaths[i])
+                    i += 1
+                lotes.append(record)
+            results.append((state_production, FarmState(state.date, state.aviaries, tuple(lotes), state.new_lote_map)))
+        return results
@@ -0,0 +1,120 @@
+# app/services/event_stepper.py
+from datetime import timedelta
+from app.models import Farmer, FarmState, project_population
+from app.services.state_generator import aviary_options, options_signature
+from app.services.dynamics_evaluator import evaluate_dynamics, apply_actions
+
+
+def hold_decision(farmer: Farmer, decision: tuple, signature: tuple, t: int, projection_time: int, initial_date,
+                  epoch_step: int = 7, raza_id: int = 1, pad_id: int = 1, buy_cantidad: int = 60000,
+                  until: int = None, trace: list = None) -> tuple[int, int]:
+    """
+    Repeats the decision taken at time step t on the following days until the next decision epoch.
+
+    A day is a decision epoch when the options offered to any aviary differ from the ones
+    offered at t (a lote crossing the recria or production age limit, a buy window opening,
+    an aviary freed by a transfer) or when epoch_step days have passed since t, so choices
+    that stay open (remain vs transfer, idle vs buy) are reconsidered periodically.
+
+    When every held action is R, I or D, lotes just remain, so their dynamics come from
+    memoized PopulationProjections in one go instead of being simulated day by day.
+
+    Args:
+        farmer: Farmer holding the state right after the decision of day t was evaluated.
+        decision: The system state applied at t, one (t, aviary_id, lote_id, action) per aviary.
+        signature: options_signature of the options offered at t.
+        t: Time step of the decision.
+        projection_time: The final time step of the simulation.
+        initial_date: Date of time step 1.
+        epoch_step: Maximum number of days a decision is held.
+        until: Last time step to hold, used to replay a known plan.
+        trace: When given, receives a (system_state, farm_state) pair per held day.
+
+    Returns:
+        A tuple (production, landing) with the production of the held days and the last
+        held time step. The farmer is left at the state of the landing day.
+    """
+    last = min(projection_time, t + epoch_step - 1)
+    if until is not None:
+        last = min(last, until)
+    if last <= t:
+        return 0, t
+    if _can_project(farmer, decision):
+        return _hold_projected(farmer, decision, signature, t, last, initial_date, trace)
+
+    production = 0
+    landing = t
+    for day in range(t + 1, last + 1):
+        before = farmer.snapshot()
+        farmer.set_date(initial_date + timedelta(days=day - 1))
+        options = aviary_options(farmer, day)
+        if options_signature(options) != signature:
+            farmer.restore(before)
+            break
+        held_state = tuple((day,) + entry[1:] for entry in decision)
+        day_production, farmer = evaluate_dynamics(held_state, farmer, raza_id, pad_id, buy_cantidad)
+        production += day_production
+        landing = day
+        if trace is not None:
+            trace.append((held_state, farmer.snapshot()))
+    return production, landing
+
+
+def _can_project(farmer: Farmer, decision: tuple) -> bool:
+    """Held days only move populations when no action transfers, sells or buys, and every live lote gets its age refreshed"""
+    if any(entry[3] not in ("R", "I", "D") for entry in decision):
+        return False
+    for lote in farmer.memo_lotes.values():
+        if lote.plote_cantidad > 0 and (lote.plote_avi_id not in farmer.memo_aviaries or lote.plote_age_days is None):
+            return False
+    return True
+
+
+def _with_projections(state: FarmState, projections: dict, days: int) -> FarmState:
+    """Replace the population fields of the projected lotes by their values after `days` held days"""
+    lotes = []
+    for record in state.lotes:
+        projection = projections.get(record.plote_id)
+        if projection is not None:
+            last_values = projection.last_values(days)
+            production, deaths = last_values if last_values else (record.plote_production, record.plote_deaths)
+            record = record._replace(plote_cantidad=projection.cantidad_after(days),
+                                     plote_production=production, plote_deaths=deaths)
+        lotes.append(record)
+    return FarmState(state.date, state.aviaries, tuple(lotes), state.new_lote_map)
+
+
+def _hold_projected(farmer: Farmer, decision: tuple, signature: tuple, t: int, last: int, initial_date, trace: list):
+    """hold_decision for R/I/D decisions, only aviaries are stepped daily to find the next epoch"""
+    projections = {}
+    for plote_id, lote in farmer.memo_lotes.items():
+        if lote.plote_cantidad > 0:
+            if lote.bio_table is None:
+                lote.fetch_bios()
+            # Ages move one day per held day, starting the day after t
+            projections[plote_id] = project_population(lote.bio_table, lote.plote_age_days + 1, lote.plote_cantidad)
+
+    landing = t
+    for day in range(t + 1, last + 1):
+        before = farmer.snapshot()
+        farmer.set_date(initial_date + timedelta(days=day - 1))
+        options = aviary_options(farmer, day)
+        if options_signature(options) != signature:
+            farmer.restore(before)
+            break
+        held_state = tuple((day,) + entry[1:] for entry in decision)
+        apply_actions(held_state, farmer)  # Only D and I change anything
+        landing = day
+        if trace is not None:
+            trace.append((held_state, _with_projections(farmer.snapshot(), projections, day - t)))
+
+    days = landing - t
+    production = 0
+    for plote_id, projection in projections.items():
+        lote = farmer.memo_lotes[plote_id]
+        production += projection.production_between(0, days)
+        lote.plote_cantidad = projection.cantidad_after(days)
+        last_values = projection.last_values(days)
+        if last_values:
+            lote.plote_production, lote.plote_deaths = last_values
+    return production, landing
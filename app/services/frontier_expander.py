@@ -0,0 +1,91 @@
+# app/services/frontier_expander.py
+import time
+from collections import namedtuple
+from datetime import timedelta
+from app.models import Farmer
+from app.services.state_generator import generate_next_states, aviary_options, options_signature, follow_decision, BUY_WINDOW_DAYS
+from app.services.dynamics_evaluator import apply_actions
+from app.services.dynamics_kernel import DynamicsKernel
+from app.services.event_stepper import hold_decision
+
+# Request parameters every expansion needs, picklable so worker processes get them once.
+# frozen maps a time step to the ((aviary_id, lote_id, action), ...) decision states follow
+# on that day wherever it is offered, see warm_start.frozen_decisions.
+ExpansionSettings = namedtuple("ExpansionSettings", [
+    "projection_time", "initial_date", "step_mode", "epoch_step", "raza_id", "pad_id", "buy_cantidad", "frozen"
+], defaults=(None,))
+
+
+def expand_frontier(farmer: Farmer, kernel: DynamicsKernel, frontier: list, t: int, settings: ExpansionSettings,
+                    timings: dict = None) -> list:
+    """
+    Expands DP states reached at the end of day t by deciding day t + 1.
+
+    Args:
+        farmer: Working Farmer, its state is overwritten.
+        kernel: DynamicsKernel used for the day of the decision.
+        frontier: (position, production, farm_state) tuples of layer t, position being the
+            state's index in the layer (search_layers), passed through to its successors.
+        t: Time step of the frontier.
+        settings: ExpansionSettings of the request.
+        timings: Optional dict the seconds spent in "generate" (options and next states),
+            "clone" (restore, actions and snapshots) and "dynamics" are added to.
+
+    Returns:
+        (position, total_production, new_state, system_state, landing, new_key) tuples in
+        enumeration order, position being the parent's, landing the layer the successor
+        belongs to and new_key its canonical key there.
+    """
+    day = t + 1
+    current_date = settings.initial_date + timedelta(days=t)
+    pending = []
+    clock = time.perf_counter
+    generate_seconds = clone_seconds = 0.0
+    for position, production, farm_state in frontier:
+        start = clock()
+        farmer.restore(farm_state)
+        farmer.set_date(current_date)
+        restored = clock()
+        options = aviary_options(farmer, day)
+        signature = options_signature(options)
+        next_states = generate_next_states(farmer, day, options)
+        if settings.frozen and day in settings.frozen:
+            next_states = follow_decision(next_states, settings.frozen[day])
+        generated = clock()
+        dated_state = farmer.snapshot()  # Ages refreshed, shared start point of every transition
+        clone_seconds += restored - start + clock() - generated
+        generate_seconds += generated - restored
+        next_states = iter(next_states)
+        while True:
+            start = clock()
+            new_system_state = next(next_states, None)  # Successors are generated lazily
+            generated = clock()
+            generate_seconds += generated - start
+            if new_system_state is None:
+                break
+            farmer.restore(dated_state)
+            apply_actions(new_system_state, farmer, settings.raza_id, settings.pad_id, settings.buy_cantidad)
+            pending.append((position, production, signature, new_system_state, farmer.snapshot()))
+            clone_seconds += clock() - generated
+
+    # Mortality and production of every successor in one batched step
+    start = clock()
+    advanced = kernel.advance([entry[4] for entry in pending])
+    successors = []
+    for (position, production, signature, new_system_state, _), (new_production, new_state) in zip(pending, advanced):
+        landing = day
+        if settings.step_mode == "event":
+            farmer.restore(new_state)
+            held_production, landing = hold_decision(farmer, new_system_state, signature, day, settings.projection_time,
+                                                     settings.initial_date, settings.epoch_step, settings.raza_id,
+                                                     settings.pad_id, settings.buy_cantidad)
+            new_production += held_production
+            new_state = farmer.snapshot()
+        new_key = new_state.canonical_key(landing, BUY_WINDOW_DAYS, farmer.aviary_classes)
+        successors.append((position, production + new_production, new_state, new_system_state, landing, new_key))
+    if timings is not None:
+        timings["generate"] = timings.get("generate", 0.0) + generate_seconds
+        timings["clone"] = timings.get("clone", 0.0) + clone_seconds
+        timings["dynamics"] = timings.get("dynamics", 0.0) + clock() - start
+    return successors
+
@@ -0,0 +1,46 @@
+# app/services/frontier_pruner.py
+from app.services.production_bound import ProductionBound
+
+
+def prune_frontier(next_dp: dict, beam_width: int, bound: ProductionBound, t: int,
+                   rank_by_lotes: bool = False, keep=frozenset()) -> tuple[dict, int, float]:
+    """
+    Keeps the beam_width states with the highest accumulated production.
+
+    With rank_by_lotes the production their lotes would still give if they all remained
+    (ProductionBound.lotes_remaining) is added to rank them, so lotes bought recently,
+    that produce nothing for months, are not dropped for it. States in keep stay on top of
+    the beam_width best, so a seeded plan survives the beam.
+
+    Args:
+        next_dp: Maps canonical state keys to (production, farm_state, prev_key, system_state) tuples.
+        beam_width: Number of states to keep, None keeps them all.
+        bound: Optimistic bound on the production still achievable after time step t.
+        t: Time step of the states in next_dp.
+        rank_by_lotes: Rank on accumulated production plus the remaining production of the lotes.
+        keep: (t, state_key) pairs never discarded, the ones of a seeded path.
+
+    Returns:
+        A tuple (kept_dp, pruned, best_pruned_bound) where best_pruned_bound is the highest
+        accumulated production plus optimistic bound among the discarded states
+        (float('-inf') when nothing was discarded).
+    """
+    if beam_width is None or len(next_dp) <= beam_width:
+        return next_dp, 0, float('-inf')
+
+    # Stable sort keeps the enumeration order on ties
+    if rank_by_lotes:
+        ranked = sorted(next_dp.items(), key=lambda item: item[1][0] + bound.lotes_remaining(item[1][1], t), reverse=True)
+    else:
+        ranked = sorted(next_dp.items(), key=lambda item: item[1][0], reverse=True)
+    kept_dp = dict(ranked[:beam_width])
+    discarded = []
+    for state_key, entry in ranked[beam_width:]:
+        if (t, state_key) in keep:
+            kept_dp[state_key] = entry
+        else:
+            discarded.append(entry)
+    if not discarded:
+        return kept_dp, 0, float('-inf')
+    best_pruned_bound = max(production + bound.remaining(farm_state, t) for production, farm_state, _, _ in discarded)
+    return kept_dp, len(discarded), best_pruned_bound
@@ -0,0 +1,136 @@
+# app/services/job_manager.py
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+from app.services.dp_algorithm import run_optimization, OptimizationCancelled
+
+logger = logging.getLogger(__name__)
+
+OPTIMIZE_JOB_WORKERS = int(os.environ.get("OPTIMIZE_JOB_WORKERS", "2"))
+MAX_FINISHED_JOBS = int(os.environ.get("MAX_FINISHED_JOBS", "100"))
+
+
+class Job:
+    """One queued /optimize run with its progress, result and cancel flag"""
+    def __init__(self, data):
+        self.job_id = uuid.uuid4().hex
+        self.data = data
+        self.status = "queued"  # queued, running, done, failed, cancelled
+        self.current_day = None
+        self.projection_time = data.get("projection_time") if isinstance(data, dict) else None
+        self.frontier_size = None
+        self.result = None
+        self.http_status = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = Event()
+        self.future = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def progress(self, t, projection_time, frontier_size):
+        self.current_day = t
+        self.projection_time = projection_time
+        self.frontier_size = frontier_size
+
+    def to_dict(self):
+        """Status and progress, without the result"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "progress": {
+                "current_day": self.current_day,
+                "projection_time": self.projection_time,
+                "frontier_size": self.frontier_size,
+            },
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs optimizations on a background thread pool so web workers only queue and poll them.
+
+    Jobs are kept in memory, the oldest finished ones are dropped past max_finished. A
+    queued job is cancelled right away, a running one stops at its next DP layer.
+    """
+    def __init__(self, workers=OPTIMIZE_JOB_WORKERS, max_finished=MAX_FINISHED_JOBS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="optimize-job")
+        self.max_finished = max_finished
+        self.jobs = OrderedDict()
+        self._lock = Lock()
+
+    def submit(self, data):
+        """Queue an optimization of an /optimize request body and return its Job"""
+        job = Job(data)
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._evict()
+        job.future = self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Ask a job to stop, returning it or None when unknown"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, "cancelled", error="Cancelled before start")
+        return job
+
+    def shutdown(self):
+        for job in list(self.jobs.values()):
+            job.cancel_event.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job):
+        if job.cancel_event.is_set():
+            self._finish(job, "cancelled", error="Cancelled before start")
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        logger.info("Job %s started", job.job_id)
+        try:
+            result, http_status = run_optimization(job.data, job.progress, job.cancel_event)
+        except OptimizationCancelled as e:
+            self._finish(job, "cancelled", error=str(e))
+        except Exception as e:
+            logger.error("Error in job %s: %s", job.job_id, e)
+            self._finish(job, "failed", error=str(e), http_status=500)
+        else:
+            status = "done" if http_status == 200 else "failed"
+            self._finish(job, status, result=result, http_status=http_status, error=result.get("error"))
+
+    def _finish(self, job, status, result=None, http_status=None, error=None):
+        job.result = result
+        job.http_status = http_status
+        job.error = error
+        job.finished_at = time.time()
+        job.status = status
+        logger.info("Job %s %s", job.job_id, status)
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+
+job_manager = JobManager()
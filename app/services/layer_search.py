@@ -0,0 +1,165 @@
+# app/services/layer_search.py
+import logging
+import time
+from app.models import Farmer
+from app.services.dynamics_kernel import DynamicsKernel
+from app.services.frontier_expander import expand_frontier, ExpansionSettings
+from app.services.frontier_pruner import prune_frontier
+from app.services.branch_and_bound import greedy_incumbent, seed_path, prune_by_bound
+from app.services.production_bound import ProductionBound
+
+logger = logging.getLogger(__name__)
+
+
+class OptimizationCancelled(Exception):
+    """Raised by search_layers when its cancel event is set"""
+
+
+def search_layers(farmer: Farmer, kernel: DynamicsKernel, dp, settings: ExpansionSettings, options: dict,
+                  bound: ProductionBound, incumbent=None, seeded=frozenset(), start: int = 0, expander=None,
+                  progress=None, cancel_event=None, metrics=None) -> dict:
+    """
+    Expands the DP layers start..projection_time - 1, the search of every optimization mode.
+
+    dp[t] holds the states reached at the end of day t, expanding it decides day t + 1. In
+    event mode a decision is held until the next epoch, so most layers stay empty. Each
+    layer is cut to the beam, then against the incumbent, expanded and merged into the
+    layers its successors land on, different action sets reaching the same farm
+    configuration collapsing into one state.
+
+    Seeded states are never cut, by the beam or the incumbent. A search cut by a beam or a
+    time budget without a seeded path dives greedily first (greedy_incumbent) and seeds the
+    dive, so it never ends below the greedy plan.
+
+    Expanded layers only keep backpointers: dp[t] becomes a list of (production, None,
+    prev_ref, system_state) tuples and the states it expands point at their position in it,
+    so neither FarmStates nor canonical keys of expanded layers stay in memory. Canonical
+    keys only index the layers still to expand. Seeded paths are written with keys, they
+    are pointed at positions once their parents are expanded.
+
+    Args:
+        farmer: Working Farmer, its state is overwritten.
+        kernel: DynamicsKernel used to advance the states.
+        dp: DP table indexed by time step, dp[start] holding the initial state under the empty key.
+        settings: ExpansionSettings, the search stops at its projection_time.
+        options: "beam_width" of the search, "rank_by_lotes" to rank the beam as
+            prune_frontier does with rank_by_lotes, and "time_budget" in seconds, after which
+            every layer keeps its best state only.
+        bound: Optimistic bound used by the beam and branch and bound pruning.
+        incumbent: Objective of a complete plan, states that cannot beat it are pruned.
+        seeded: (t, state_key) pairs of a complete path written into dp (seed_path), never pruned.
+        start: First time step to expand.
+        expander: Optional ParallelExpander, layers are expanded in this process otherwise.
+        progress: Optional callable receiving (t, projection_time, frontier_size) before each layer is expanded.
+        cancel_event: Optional threading.Event, OptimizationCancelled is raised at the next layer once set.
+        metrics: Optional RunMetrics every expanded layer is recorded in.
+
+    Returns:
+        A dict with the [frontier, successors, merged, pruned] counts of every expanded
+        layer by time step ("layers"), the successors merged into each layer ("merged",
+        index t - 1), the states cut by the beam ("beam_pruned") and by the incumbent
+        ("bound_pruned"), the best bound among the ones cut by the beam
+        ("best_pruned_bound") and the time step the time budget ran out at
+        ("budget_exhausted_at", None if it did not) and the production of the greedy dive
+        ("dive_production", None without one).
+    """
+    projection_time = settings.projection_time
+    beam_width = options.get("beam_width")
+    time_budget = options.get("time_budget")
+    rank_by_lotes = options.get("rank_by_lotes", False)
+    layers = {}
+    merged_states = [0] * projection_time
+    beam_pruned = bound_pruned = 0
+    best_pruned_bound = float('-inf')
+    budget_exhausted_at = None
+    dive_production = None
+    if (beam_width is not None or time_budget is not None) and not seeded:
+        (_, root_state, _, _), = dp[start].values()
+        path, dive_production = greedy_incumbent(farmer, kernel, root_state, settings, bound, start)
+        seeded = set()
+        seed_path(dp, path, seeded, start)
+    children = {}  # Parent layer -> parent key -> (t, state_key) of the seeded states pointing at it by key
+    for layer, state_key in seeded:
+        entry = dp[layer].get(state_key)
+        if entry is not None and entry[2] is not None:
+            prev_t, prev_key = entry[2]
+            children.setdefault(prev_t, {}).setdefault(prev_key, []).append((layer, state_key))
+    start_time = time.perf_counter()
+    for t in range(start, projection_time):
+        if not dp[t]:
+            _repoint(dp, t, children.pop(t, {}), {})
+            continue
+        layer_start = time.perf_counter()
+        if cancel_event is not None and cancel_event.is_set():
+            raise OptimizationCancelled(f"Optimization cancelled at t={t}")
+        if time_budget is not None and budget_exhausted_at is None and time.perf_counter() - start_time > time_budget:
+            budget_exhausted_at = t
+            logger.info("Time budget of %ss exhausted at t=%s, continuing greedily", time_budget, t)
+        width = 1 if budget_exhausted_at is not None else beam_width
+        dp[t], pruned, pruned_bound = prune_frontier(dp[t], width, bound, t, rank_by_lotes, seeded)
+        beam_pruned += pruned
+        best_pruned_bound = max(best_pruned_bound, pruned_bound)
+        if incumbent is not None:
+            # Exact: a state whose optimistic completion cannot reach the incumbent is never optimal
+            dp[t], layer_bound_pruned = prune_by_bound(dp[t], t, bound, incumbent, seeded)
+            bound_pruned += layer_bound_pruned
+            pruned += layer_bound_pruned
+        logger.debug("t=%s: %s states, %s merged, %s pruned", t, len(dp[t]), merged_states[t - 1] if t else 0, pruned)
+        if progress is not None:
+            progress(t, projection_time, len(dp[t]))
+
+        frontier = [(position, production, farm_state)
+                    for position, (production, farm_state, _, _) in enumerate(dp[t].values())]
+        timings = {}
+        if expander is not None:
+            successors = expander.expand(frontier, t, timings)
+        else:
+            successors = expand_frontier(farmer, kernel, frontier, t, settings, timings)
+        merge_start = time.perf_counter()
+        merged = 0
+        for position, total_production, new_state, new_system_state, landing, new_key in successors:
+            next_dp = dp[landing]
+            if new_key in next_dp:
+                merged_states[landing - 1] += 1
+                merged += 1
+                if next_dp[new_key][0] >= total_production:
+                    continue
+            next_dp[new_key] = (total_production, new_state, (t, position), new_system_state)
+        if t in children:
+            _repoint(dp, t, children.pop(t), {state_key: position for position, state_key in enumerate(dp[t])})
+        # Expanded layers only keep backpointers, replay_plan rebuilds the optimal path's states
+        dp[t] = [(production, None, prev_ref, system_state) for production, _, prev_ref, system_state in dp[t].values()]
+        layer_end = time.perf_counter()
+        timings["merge"] = layer_end - merge_start
+        layers[t] = [len(frontier), len(successors), merged, pruned]
+        if metrics is not None:
+            metrics.record_day(t, len(frontier), len(successors), merged, pruned, layer_end - layer_start, timings)
+        del frontier, successors
+    return {
+        "layers": layers,
+        "merged": merged_states,
+        "beam_pruned": beam_pruned,
+        "bound_pruned": bound_pruned,
+        "best_pruned_bound": best_pruned_bound,
+        "budget_exhausted_at": budget_exhausted_at,
+        "dive_production": dive_production,
+    }
+
+
+def _repoint(dp, t, children: dict, positions: dict):
+    """
+    Points the seeded states still referring to a parent in layer t by key at its position.
+
+    A seeded state whose parent was pruned is unreachable and removed, so are its own seeded
+    children when their layer comes. States a better expansion replaced are left alone.
+    """
+    for prev_key, refs in children.items():
+        position = positions.get(prev_key)
+        for layer, state_key in refs:
+            entry = dp[layer].get(state_key)
+            if entry is None or entry[2] != (t, prev_key):
+                continue
+            if position is None:
+                del dp[layer][state_key]
+            else:
+                dp[layer][state_key] = (entry[0], entry[1], (t, position), entry[3])
@@ -0,0 +1,132 @@
+# app/services/parallel_expander.py
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from app.models import Farmer, Aviario
+from app.utils.padron_cache import PadronCache
+from app.utils.lote_allocator import LoteAllocator
+from app.services.dynamics_kernel import DynamicsKernel
+from app.services.frontier_expander import expand_frontier, ExpansionSettings
+
+_worker = {}
+
+
+def static_payload(farmer: Farmer, avi_ids=None, allocator_offset: int = 0):
+    """
+    Static aviary fields and classes, loaded padrones, the lote allocator seed and the allowed
+    buy days, all a worker needs besides packed states.
+
+    avi_ids restricts the aviaries to a subset, allocator_offset skips that many purchases so
+    farmers solving different parts of the farm never hand out the same virtual lote.
+    """
+    aviaries = [
+        (aviary.avi_id, aviary.avi_name, aviary.avi_capacidad_ideal, aviary.avi_fase, aviary.disinfection_period_days)
+        for aviary in farmer.memo_aviaries.values()
+        if avi_ids is None or aviary.avi_id in avi_ids
+    ]
+    aviary_classes = {avi_id: aviary_class for avi_id, aviary_class in farmer.aviary_classes.items()
+                      if avi_ids is None or avi_id in avi_ids}
+    farmer.lote_allocator.load()
+    base_id, name_addend = farmer.lote_allocator.snapshot()
+    allocator_seed = (base_id + allocator_offset, name_addend + 2 * allocator_offset)
+    return aviaries, aviary_classes, farmer.padron_cache.snapshot(), allocator_seed, farmer.buy_days
+
+
+def farmer_from_payload(payload) -> Farmer:
+    """Farmer holding the static aviaries of a static_payload, dynamic state comes from restoring a FarmState"""
+    aviaries, aviary_classes, patterns, allocator_seed, buy_days = payload
+    padron_cache = PadronCache()
+    padron_cache.seed(patterns)
+    lote_allocator = LoteAllocator()
+    lote_allocator.seed(*allocator_seed)
+    farmer = Farmer(padron_cache=padron_cache, lote_allocator=lote_allocator)
+    farmer.aviary_classes = aviary_classes
+    farmer.buy_days = buy_days
+    for avi_id, avi_name, avi_capacidad_ideal, avi_fase, disinfection_period_days in aviaries:
+        aviary = Aviario(avi_id)
+        aviary.avi_name = avi_name
+        aviary.avi_capacidad_ideal = avi_capacidad_ideal
+        aviary.avi_fase = avi_fase
+        aviary.disinfection_period_days = disinfection_period_days
+        farmer.memo_aviaries[avi_id] = aviary
+    return farmer
+
+
+def _init_worker(payload, settings, use_numpy):
+    farmer = farmer_from_payload(payload)
+    _worker["farmer"] = farmer
+    _worker["kernel"] = DynamicsKernel(use_numpy)
+    _worker["settings"] = settings
+
+
+# Workers are started clean rather than forked, the processes creating pools run Flask and job
+# threads whose locks a forked child could inherit held
+MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+
+def _expand_shard(shard, t):
+    farmer = _worker["farmer"]
+    frontier = [(position, production, farmer.unpack_state(packed)) for position, production, packed in shard]
+    timings = {}
+    successors = expand_frontier(farmer, _worker["kernel"], frontier, t, _worker["settings"], timings)
+    return [
+        (position, total_production, farmer.pack_state(new_state), system_state, landing, new_key)
+        for position, total_production, new_state, system_state, landing, new_key in successors
+    ], timings
+
+
+class ParallelExpander:
+    """
+    Process pool that expands a DP layer in shards, one process per core given the GIL.
+
+    Workers are seeded once with the static farm (aviaries and padron patterns) and only
+    exchange packed FarmStates. Shards keep the frontier order and results are concatenated
+    in shard order, so merging them gives exactly the sequential result.
+    """
+    def __init__(self, farmer: Farmer, kernel: DynamicsKernel, settings: ExpansionSettings, workers: int, min_states_per_shard: int = 4):
+        self.farmer = farmer
+        self.kernel = kernel
+        self.settings = settings
+        self.workers = workers
+        self.min_states_per_shard = min_states_per_shard
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=MP_CONTEXT,
+            initializer=_init_worker,
+            initargs=(static_payload(farmer), settings, kernel.use_numpy)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def expand(self, frontier: list, t: int, timings: dict = None) -> list:
+        """
+        Same contract as expand_frontier, with frontier sharded across the pool.
+
+        timings adds up the seconds of every worker, so it is CPU time rather than wall time.
+        """
+        if len(frontier) < 2 * self.min_states_per_shard:
+            return expand_frontier(self.farmer, self.kernel, frontier, t, self.settings, timings)  # Not worth the round trip
+        shard_size = max(self.min_states_per_shard, math.ceil(len(frontier) / (self.workers * 4)))
+        shards = [
+            [(position, production, self.farmer.pack_state(farm_state))
+             for position, production, farm_state in frontier[i:i + shard_size]]
+            for i in range(0, len(frontier), shard_size)
+        ]
+        futures = [self.executor.submit(_expand_shard, shard, t) for shard in shards]
+        successors = []
+        for future in futures:
+            shard_successors, shard_timings = future.result()
+            for position, total_production, packed, system_state, landing, new_key in shard_successors:
+                successors.append((position, total_production, self.farmer.unpack_state(packed), system_state, landing, new_key))
+            if timings is not None:
+                for name, seconds in shard_timings.items():
+                    timings[name] = timings.get(name, 0.0) + seconds
+        return successors
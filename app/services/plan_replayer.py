@@ -0,0 +1,50 @@
+# app/services/plan_replayer.py
+from datetime import timedelta
+from app.models import Farmer, FarmState
+from app.services.state_generator import aviary_options, options_signature
+from app.services.dynamics_evaluator import evaluate_dynamics
+from app.services.event_stepper import hold_decision
+
+
+def replay_plan(farmer: Farmer, initial_state: FarmState, decisions: list, projection_time: int, initial_date,
+                epoch_step: int = 7, raza_id: int = 1, pad_id: int = 1, buy_cantidad: int = 60000,
+                start: int = 0) -> tuple[list, list]:
+    """
+    Re-simulates the optimal plan day by day to rebuild the farm state of every day.
+
+    Args:
+        farmer: Working Farmer, its state is overwritten.
+        initial_state: FarmState at the end of time step start, before the first simulated day by default.
+        decisions: (t, system_state, landing) tuples in time order, one per DP transition of the
+            optimal path, where days t+1..landing hold the decision taken at t.
+        projection_time: The final time step of the simulation.
+        initial_date: Date of time step 1.
+        start: Time step of initial_state, the plan covers start+1..projection_time.
+
+    Returns:
+        A tuple (day_actions, day_states) where day_actions[t - start - 1] is the system state
+        applied on time step t and day_states[t - start] the FarmState after it (day_states[0]
+        is initial_state).
+    """
+    farmer.restore(initial_state)
+    day_actions = []
+    day_states = [initial_state]
+    for t, system_state, landing in decisions:
+        farmer.set_date(initial_date + timedelta(days=t - 1))
+        options = aviary_options(farmer, t)  # Refreshes ages exactly as the optimizer did
+        _, farmer = evaluate_dynamics(system_state, farmer, raza_id, pad_id, buy_cantidad)
+        day_actions.append(system_state)
+        day_states.append(farmer.snapshot())
+        if landing > t:
+            trace = []
+            _, held_until = hold_decision(farmer, system_state, options_signature(options), t, projection_time,
+                                          initial_date, epoch_step, raza_id, pad_id, buy_cantidad,
+                                          until=landing, trace=trace)
+            if held_until != landing:
+                raise ValueError(f"Replay diverged at t={t}: held until {held_until}, expected {landing}")
+            for held_state, farm_state in trace:
+                day_actions.append(held_state)
+                day_states.append(farm_state)
+    if len(day_actions) != projection_time - start:
+        raise ValueError(f"Replay covered {len(day_actions)} days out of {projection_time - start}")
+    return day_actions, day_states
@@ -0,0 +1,68 @@
+# app/services/production_bound.py
+from app.models import Farmer, FarmState, project_population
+from app.services.state_generator import BUY_WINDOW_DAYS, BUY_MIN_CAPACITY
+
+
+class ProductionBound:
+    """
+    Admissible (optimistic) upper bound on the production a DP state can still achieve.
+
+    Every lote remains in its aviary for the rest of the horizon and is projected day by
+    day like Lote.population_dynamics, rounding included. Production only depends on the
+    population and age of the lotes, and the population a day leaves never grows with
+    fewer hens, so transfers cannot do better and sales only lower it: the projection is
+    the most any plan gets from the current lotes. New lotes are bought as early and as
+    often as the buy window allows, ignoring aviary availability.
+    """
+    def __init__(self, farmer: Farmer, projection_time: int, pad_id: int, buy_cantidad: int, buy_window: int = BUY_WINDOW_DAYS):
+        self.projection_time = projection_time
+        self.buy_cantidad = buy_cantidad
+        self.buy_window = buy_window
+        self.can_buy = any(
+            aviary.avi_fase == "recria" and aviary.avi_capacidad_ideal >= BUY_MIN_CAPACITY
+            for aviary in farmer.memo_aviaries.values()
+        )
+        self.buy_table = farmer.padron_cache.table(pad_id) if self.can_buy else None
+        self._buy_memo = {}
+
+    def remaining(self, farm_state: FarmState, t: int) -> float:
+        """Upper bound on the production of days t+1..projection_time from a state reached at t"""
+        days_left = self.projection_time - t
+        if days_left <= 0:
+            return 0
+        bound = self.lotes_remaining(farm_state, t)
+        if self.can_buy:
+            last_buy = farm_state.last_buy()
+            first_offset = max(1, last_buy + self.buy_window - t) if last_buy is not None else 1
+            bound += self._buy_bound(days_left, first_offset)
+        return bound
+
+    def lotes_remaining(self, farm_state: FarmState, t: int) -> int:
+        """Production of days t+1..projection_time of the lotes of a state reached at t if they all remain"""
+        days_left = self.projection_time - t
+        if days_left <= 0:
+            return 0
+        bound = 0
+        for record in farm_state.lotes:
+            if record.plote_cantidad <= 0:
+                continue
+            if record.lote.bio_table is None:
+                record.lote.fetch_bios()
+            if not record.lote.bio_table:
+                continue
+            # Ages move one day per remaining day, starting the day after t
+            age_days = (record.plote_age_days or 0) + 1
+            projection = project_population(record.lote.bio_table, age_days, record.plote_cantidad)
+            bound += projection.production_between(0, days_left)
+        return bound
+
+    def _buy_bound(self, days_left, first_offset):
+        """Production of buying at every opportunity from first_offset days on"""
+        key = (days_left, first_offset)
+        if key not in self._buy_memo:
+            bound = 0
+            projection = project_population(self.buy_table, 0, self.buy_cantidad)
+            for offset in range(first_offset, days_left + 1, self.buy_window):
+                bound += projection.production_between(0, days_left - offset + 1)
+            self._buy_memo[key] = bound
+        return self._buy_memo[key]
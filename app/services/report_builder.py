@@ -0,0 +1,79 @@
+# app/services/report_builder.py
+from datetime import timedelta
+
+
+def build_solution_table(day_actions: list, day_states: list, aviaries: dict, initial_date) -> list:
+    """
+    Builds the optimal solution table, one row per (day, aviary) of the optimal path.
+
+    Args:
+        day_actions: The system state applied on each time step, day_actions[t - 1] for step t.
+        day_states: FarmState after each time step, day_states[0] being the initial state.
+        aviaries: The Farmer's memo_aviaries, source of the static aviary fields.
+        initial_date: Date of the first simulated day.
+
+    Returns:
+        A list of JSON-ready rows.
+    """
+    table_data = []
+    for t in range(1, len(day_actions) + 1):
+        current_date = initial_date + timedelta(days=t - 1)
+        current_state = day_actions[t - 1]
+        current_farm = day_states[t]
+        prev_farm = day_states[t - 1]
+
+        for (time, aviary_id, lote_id, action) in current_state:
+            if lote_id == "NEW_LOTE" and action == "B":
+                lote_id = current_farm.new_lote((t, aviary_id, "NEW_LOTE", "B"), "Unknown")
+
+            aviary_type = aviaries[aviary_id].avi_fase if aviary_id in aviaries else "Unknown"
+            if lote_id and lote_id != "Unknown":
+                current_lote = current_farm.lote(lote_id)
+                prev_lote = prev_farm.lote(lote_id) if t > 1 else None
+                age_days = current_lote.plote_age_days if current_lote else "N/A"
+                age_weeks = current_lote.plote_age_weeks if current_lote else "N/A"
+                pop_before = current_lote.plote_cantidad if t == 1 else (prev_lote.plote_cantidad if prev_lote else current_lote.plote_cantidad)
+                deaths = current_lote.plote_deaths if current_lote else 0
+                pop_now = pop_before - deaths if current_lote else 0
+                production = current_lote.plote_production if current_lote else 0
+                pop_before = max(0, pop_before)
+                deaths = max(0, deaths)
+                pop_now = max(0, pop_now)
+                production = max(0, production)
+            else:
+                age_days = "N/A"
+                age_weeks = "N/A"
+                pop_before = "N/A"
+                deaths = "N/A"
+                pop_now = "N/A"
+                production = "N/A"
+
+            if t == 1:
+                detailed_action = f"Initial ({action})"
+            else:
+                prev_state = day_actions[t - 2]
+                prev_action = action
+                for (prev_t, prev_aviary, prev_lote, prev_action_candidate) in prev_state:
+                    if prev_lote == lote_id and prev_aviary == aviary_id:
+                        prev_action = prev_action_candidate
+                    elif prev_lote == lote_id and prev_action_candidate == "T":
+                        prev_action = f"T (from {prev_aviary})"
+                detailed_action = prev_action
+
+            row = {
+                "t": t,
+                "date": str(current_date),
+                "aviary": aviary_id,
+                "aviary_type": aviary_type,
+                "lote": str(lote_id) if lote_id else "None",
+                "age_days": str(age_days),
+                "age_weeks": str(age_weeks),
+                "action": detailed_action,
+                "pop_before": str(pop_before),
+                "deaths": str(deaths),
+                "pop_now": str(pop_now),
+                "production": str(production)
+            }
+            table_data.append(row)
+
+    return table_data
@@ -0,0 +1,116 @@
+# app/services/rolling_horizon.py
+import logging
+from collections import defaultdict
+from app.models import Farmer, FarmState
+from app.services.dynamics_kernel import DynamicsKernel
+from app.services.frontier_expander import ExpansionSettings
+from app.services.branch_and_bound import greedy_incumbent, seed_path
+from app.services.layer_search import search_layers
+from app.services.plan_replayer import replay_plan
+from app.services.production_bound import ProductionBound
+
+logger = logging.getLogger(__name__)
+
+ROLLING_TERMINAL_DAYS = 364  # Days past a window its lotes are valued for, beyond the first laying months of a bought lote
+
+
+def solve_rolling(farmer: Farmer, kernel: DynamicsKernel, initial_state: FarmState, settings: ExpansionSettings,
+                  options: dict, window: int, step: int = 7, terminal_days: int = ROLLING_TERMINAL_DAYS,
+                  progress=None, cancel_event=None, metrics=None) -> dict:
+    """
+    Receding-horizon optimization: solves a window, keeps its first days, solves again from there.
+
+    Each window is a DP over time steps start+1..start+window. Its end states are ranked by
+    the production of the window plus a terminal value, what their lotes would still produce
+    over the next terminal_days (up to projection_time) following their padron curves, so
+    lotes bought late in a window count before they start laying. The beam ranks states the
+    same way. The decisions landing within the first `step` days are
+    committed (at least one, as an event mode decision can be held longer) and replayed to
+    get the state the next window starts from. The last window commits everything.
+
+    Only one window's DP table is alive at a time and projections never go further than
+    window + terminal_days, so memory is bounded by the window and runtime grows linearly
+    with projection_time for a given farm, window and step.
+
+    Args:
+        farmer: Working Farmer, its state is overwritten.
+        kernel: DynamicsKernel used to advance the states.
+        initial_state: FarmState before the first simulated day.
+        settings: ExpansionSettings of the whole run.
+        options: "beam_width" and "branch_and_bound" of every window.
+        window: Days optimized by each window.
+        step: Days committed from each window.
+        terminal_days: Days past the end of a window covered by the terminal value.
+        progress: Optional callable receiving (t, projection_time, frontier_size) before each
+            layer of a window is expanded.
+        cancel_event: Optional threading.Event, see search_layers.
+        metrics: Optional RunMetrics the layers of every window are recorded in, windows
+            overlap so a time step is recorded once per window expanding it.
+
+    Returns:
+        A dict with the max_production and the day_actions and day_states of the stitched
+        plan, like replay_plan returns them, and one summary per window.
+    """
+    projection_time = settings.projection_time
+    options = dict(options, rank_by_lotes=True)
+    window_progress = None
+    if progress is not None:
+        def window_progress(t, _, frontier_size):
+            progress(t, projection_time, frontier_size)
+    day_actions, day_states = [], [initial_state]
+    windows = []
+    max_production = 0
+    state, start = initial_state, 0
+    while start < projection_time:
+        end = min(start + window, projection_time)
+        window_settings = settings._replace(projection_time=end)
+        # Bounds the window's states up to the terminal horizon, its lote part is the terminal value
+        bound = ProductionBound(farmer, min(projection_time, end + terminal_days), settings.pad_id, settings.buy_cantidad)
+        farmer.restore(state)
+        dp = defaultdict(dict)
+        dp[start] = {tuple(): (0, state, None, tuple())}
+        incumbent = None
+        seeded = set()
+        if options.get("branch_and_bound"):
+            path, dive_production = greedy_incumbent(farmer, kernel, state, window_settings, bound, start)
+            incumbent = dive_production + bound.lotes_remaining(path[-1][3], end)
+            seed_path(dp, path, seeded, start)
+        window_layers = search_layers(farmer, kernel, dp, window_settings, options, bound, incumbent, seeded, start,
+                                      progress=window_progress, cancel_event=cancel_event, metrics=metrics)["layers"]
+
+        best_value, best_key = None, None
+        for state_key, (production, end_state, _, _) in dp[end].items():
+            value = production + bound.lotes_remaining(end_state, end)
+            if best_value is None or value > best_value:
+                best_value, best_key = value, state_key
+        if best_key is None:
+            raise ValueError(f"No states at the end of the window {start + 1}..{end}")
+        refs = []
+        ref = (end, best_key)
+        while ref[0] > start:
+            refs.append(ref)
+            ref = dp[ref[0]][ref[1]][2]
+        refs.reverse()
+
+        commit_to = projection_time if end == projection_time else start + step
+        committed = refs[:1] + [ref for ref in refs[1:] if ref[0] <= commit_to]
+        decisions = [(dp[layer][key][2][0] + 1, dp[layer][key][3], layer) for layer, key in committed]
+        landing = committed[-1][0]
+        window_actions, window_states = replay_plan(farmer, state, decisions, landing, settings.initial_date,
+                                                    settings.epoch_step, settings.raza_id, settings.pad_id,
+                                                    settings.buy_cantidad, start=start)
+        committed_production = dp[landing][committed[-1][1]][0]
+        windows.append({"start": start, "end": end, "committed_to": landing, "production": committed_production,
+                        "states_expanded": sum(counts[0] for counts in window_layers.values())})
+        logger.debug("Window %s..%s committed up to %s, %s produced", start + 1, end, landing, committed_production)
+        max_production += committed_production
+        day_actions.extend(window_actions)
+        day_states.extend(window_states[1:])
+        state, start = window_states[-1], landing
+        del dp
+    return {
+        "max_production": max_production,
+        "day_actions": day_actions,
+        "day_states": day_states,
+        "windows": windows,
+    }
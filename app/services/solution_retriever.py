@@ -1,4 +1,7 @@
 # app/services/solution_extractor.py
+import logging
+
+logger = logging.getLogger(__name__)
 
 def retrieve_optimal_solution(dp: list, projection_time: int) -> tuple[float, list]:
     """
@@ -6,13 +9,19 @@ def retrieve_optimal_solution(dp: list, projection_time: int) -> tuple[float, li
     and the sequence of states that achieves it.
 
     Args:
-        dp: A list of dictionaries where dp[t] maps system states to (production, farmer, prev_state) tuples.
+        dp: The DP table, dp[projection_time] mapping canonical state keys to
+            (production, farm_state, prev_ref, system_state) tuples, prev_ref being the
+            (t, position) of the state it was expanded from (None for the initial state).
+            Expanded layers are lists of the same tuples indexed by position, see
+            layer_search.search_layers, only their backpointers are needed.
         projection_time: The final time step of the simulation.
 
     Returns:
         A tuple (max_production, state_sequence) where:
             - max_production: The highest production value achieved.
-            - state_sequence: A list of system states from t=1 to t=projection_time.
+            - state_sequence: The (t, key) references of the optimal path in time order,
+              one per layer it went through, without the initial state. The last one holds
+              a canonical key, the others positions in their expanded layer.
 
     Raises:
         ValueError: If no states exist at the final time step or if production values are invalid.
@@ -23,23 +32,22 @@ def retrieve_optimal_solution(dp: list, projection_time: int) -> tuple[float, li
     
     max_production = float('-inf')
     optimal_state = None
-    print(f"Extracting solution at t={projection_time}, dp[{projection_time}] has {len(dp[projection_time])} states")
+    logger.info("Extracting solution at t=%s, dp[%s] has %s states", projection_time, projection_time, len(dp[projection_time]))
     
-    for system_state, value in dp[projection_time].items():
-        production, farmer, prev_state = value
-        print(f"State={system_state}, Production={production} (type: {type(production)})")
+    for state_key, value in dp[projection_time].items():
+        production, farm_state, prev_ref, system_state = value
+        logger.debug("State=%s, Production=%s (type: %s)", system_state, production, type(production))
         if not isinstance(production, (int, float)):
             raise ValueError(f"Invalid production type in dp[{projection_time}]: {type(production)}")
         if production > max_production:
             max_production = production
-            optimal_state = system_state
+            optimal_state = state_key
 
     state_sequence = []
-    current_state = optimal_state
-    for t in range(projection_time, 0, -1):
-        state_sequence.append(current_state)
-        if t > 1:
-            current_state = dp[t][current_state][2]
+    current_ref = (projection_time, optimal_state)
+    while current_ref is not None and current_ref[0] > 0:
+        state_sequence.append(current_ref)
+        current_ref = dp[current_ref[0]][current_ref[1]][2]
     state_sequence.reverse()
 
     return max_production, state_sequence
\ No newline at end of file
@@ -1,52 +1,157 @@
-import itertools
 from app.models import Farmer
 
-def generate_next_states(farmer: Farmer, t: int):
+BUY_WINDOW_DAYS = 14
+BUY_MIN_CAPACITY = 60000
+MAX_BUYS_PER_STEP = 1
+
+def aviary_options(farmer: Farmer, t: int):
     """
-    Generates all possible next system states for time step t, including buying new lotes with a 14-day restriction.
-    
+    Lists the possible (t, aviary_id, lote_id, action) entries of every aviary for time step t,
+    including buying new lotes with a 14-day restriction. Refreshes the age of placed lotes.
+
+    Among interchangeable aviaries (farmer.aviary_classes) in the same state only the first
+    one is offered the buy, the others would give the same production. Buys are only offered
+    on farmer.buy_days when it is set.
+
     Args:
         farmer: Farmer instance with current aviaries and lotes.
         t: Current time step (assumed to be in days).
-    
+
     Returns:
-        List of tuples representing possible next states.
+        A list with one list of options per aviary, in memo_aviaries order.
     """
     aviary_combinations = []
     
     # Check if a buy occurred within the last 14 days
-    can_buy = True
+    can_buy = farmer.buy_days is None or t in farmer.buy_days
     for (buy_t, _, _, buy_action) in farmer.new_lote_map.keys():
-        if buy_action == "B" and t - buy_t < 14:  # Assuming t is in days
+        if buy_action == "B" and t - buy_t < BUY_WINDOW_DAYS:  # Assuming t is in days
             can_buy = False
             break
 
+    offered_buys = set()  # (class, state) of the interchangeable aviaries already offered a buy
     for aviary in farmer.memo_aviaries.values():
         possible_states = []
         if not aviary.allocated_lote and aviary.needs_disinfection:
             possible_states.append((t, aviary.avi_id, None, "D"))
         elif not aviary.allocated_lote and not aviary.needs_disinfection:
             possible_states.append((t, aviary.avi_id, None, "I"))
-            if aviary.avi_fase == "recria" and aviary.avi_capacidad_ideal >= 60000 and can_buy:
-                possible_states.append((t, aviary.avi_id, "NEW_LOTE", "B"))
+            if aviary.avi_fase == "recria" and aviary.avi_capacidad_ideal >= BUY_MIN_CAPACITY and can_buy:
+                # Sold lotes still pointing at the aviary give it options of its own
+                aviary_class = None if farmer.lotes_in_aviary(aviary.avi_id) else farmer.aviary_classes.get(aviary.avi_id)
+                buy_slot = (aviary_class, aviary.is_active, aviary.was_inactive, aviary.disinfection_due_date)
+                if aviary_class is None or buy_slot not in offered_buys:
+                    offered_buys.add(buy_slot)
+                    possible_states.append((t, aviary.avi_id, "NEW_LOTE", "B"))
         
-        for lote in farmer.memo_lotes.values():
-            if lote.plote_avi_id == aviary.avi_id:
-                lote.set_plote_age()  # Update lote age based on current date/time step
-                if aviary.avi_fase == "recria":
-                    if lote.plote_age_weeks < 19:
-                        possible_states.append((t, aviary.avi_id, lote.plote_id, "R"))
-                    else:
-                        possible_states.append((t, aviary.avi_id, lote.plote_id, "T"))
-                elif aviary.avi_fase == "produccion":
-                    possible_states.append((t, aviary.avi_id, lote.plote_id, "R"))  # Always allow remain
-                    if lote.plote_age_weeks >= 67:
-                        possible_states.append((t, aviary.avi_id, lote.plote_id, "T"))  # Allow transfer if age >= 67
-                elif aviary.avi_fase == "predescarte":
+        for lote in farmer.lotes_in_aviary(aviary.avi_id):
+            lote.set_plote_age()  # Update lote age based on current date/time step
+            if aviary.avi_fase == "recria":
+                if lote.plote_age_weeks < 19:
                     possible_states.append((t, aviary.avi_id, lote.plote_id, "R"))
-                    if lote.is_selling:
-                        possible_states.append((t, aviary.avi_id, lote.plote_id, "S"))
+                else:
+                    possible_states.append((t, aviary.avi_id, lote.plote_id, "T"))
+            elif aviary.avi_fase == "produccion":
+                possible_states.append((t, aviary.avi_id, lote.plote_id, "R"))  # Always allow remain
+                if lote.plote_age_weeks >= 67:
+                    possible_states.append((t, aviary.avi_id, lote.plote_id, "T"))  # Allow transfer if age >= 67
+            elif aviary.avi_fase == "predescarte":
+                possible_states.append((t, aviary.avi_id, lote.plote_id, "R"))
+                if lote.is_selling:
+                    possible_states.append((t, aviary.avi_id, lote.plote_id, "S"))
         aviary_combinations.append(possible_states)
-    
-    unique_combinations = list({tuple(sorted(combination, key=lambda x: x[1])) for combination in itertools.product(*aviary_combinations)})
-    return unique_combinations
\ No newline at end of file
+    return aviary_combinations
+
+
+def options_signature(aviary_combinations):
+    """Options of every aviary without the time step, to compare the choices offered on two days"""
+    return tuple(tuple(option[1:] for option in possible_states) for possible_states in aviary_combinations)
+
+
+def generate_next_states(farmer: Farmer, t: int, aviary_combinations=None, max_buys: int = MAX_BUYS_PER_STEP):
+    """
+    Yields the possible next system states for time step t, one option per aviary, sorted by aviary id.
+
+    Combinations are built aviary by aviary, so infeasible ones are never materialized: the buy
+    window and the aviary capacity are already applied by aviary_options, and a branch stops
+    offering "B" once it holds max_buys buys. Every aviary appears once with distinct options,
+    so no combination is yielded twice.
+
+    Args:
+        farmer: Farmer instance with current aviaries and lotes.
+        t: Current time step (assumed to be in days).
+        aviary_combinations: Options already computed by aviary_options for this farmer and t.
+        max_buys: Maximum number of lotes bought on the same time step.
+
+    Yields:
+        Tuples of (t, aviary_id, lote_id, action) entries representing a next state.
+    """
+    if aviary_combinations is None:
+        aviary_combinations = aviary_options(farmer, t)
+    per_aviary = sorted((list(dict.fromkeys(possible_states)) for possible_states in aviary_combinations if possible_states),
+                        key=lambda possible_states: possible_states[0][1])
+    if len(per_aviary) != len(aviary_combinations):
+        return  # An aviary without options leaves no feasible combination
+    yield from _combinations(per_aviary, max_buys)
+
+
+def _combinations(per_aviary, max_buys):
+    """
+    Depth-first enumeration in itertools.product order, pruning branches over the buy limit.
+
+    Iterative and only over the aviaries with a choice, the others keep their single option in
+    a shared template, so large farms where most aviaries have one option stay cheap.
+    """
+    template = [options[0] for options in per_aviary]
+    varied = [index for index, options in enumerate(per_aviary) if len(options) > 1]
+    fixed_buys = sum(1 for options in per_aviary if len(options) == 1 and options[0][3] == "B")
+    if fixed_buys > max_buys:
+        return
+    depth = len(varied)
+    if not depth:
+        yield tuple(template)
+        return
+    buys = [fixed_buys] * depth  # Buys before each varied level
+    positions = [0] * depth  # Next option to try at each varied level
+    level = 0
+    while level >= 0:
+        options = per_aviary[varied[level]]
+        position = positions[level]
+        if position == len(options):
+            positions[level] = 0
+            level -= 1
+            continue
+        positions[level] = position + 1
+        option = options[position]
+        level_buys = buys[level] + (option[3] == "B")
+        if level_buys > max_buys:
+            continue
+        template[varied[level]] = option
+        if level + 1 == depth:
+            yield tuple(template)
+        else:
+            level += 1
+            buys[level] = level_buys
+
+
+def follow_decision(next_states, decision):
+    """
+    Keeps the next states that repeat a previous decision on every aviary where it is still offered.
+
+    Args:
+        next_states: Next system states of one farm state, as yielded by generate_next_states.
+        decision: Previous (aviary_id, lote_id, action) entries of the same day.
+
+    Returns:
+        The matching next states, or all of them when no combination can follow every offered entry.
+    """
+    next_states = list(next_states)
+    offered = {entry[1:] for next_state in next_states for entry in next_state}
+    required = {entry[0]: entry for entry in decision if entry in offered}
+    if not required:
+        return next_states
+    following = [
+        next_state for next_state in next_states
+        if all(required.get(entry[1], entry[1:]) == entry[1:] for entry in next_state)
+    ]
+    return following or next_states
@@ -0,0 +1,36 @@
+# app/services/symmetry.py
+from app.models import Farmer
+
+# Phases whose aviaries can be interchangeable. Produccion and predescarte aviaries receive
+# transfers first-fit in memo order (Farmer.find_aviary), so their position matters, recria
+# aviaries only receive bought lotes.
+SYMMETRIC_PHASES = ("recria",)
+
+
+def aviary_classes(farmer: Farmer, phases=SYMMETRIC_PHASES) -> dict:
+    """
+    Groups aviaries that only differ by their ID into equivalence classes.
+
+    Two aviaries are interchangeable when they have the same phase, ideal capacity and
+    disinfection period, and their phase is in `phases`. With the same dynamic state
+    (allocation, activity and disinfection), putting a lote in one or the other gives the
+    same production, so aviary_options offers a buy to one representative per class and
+    FarmState.canonical_key merges states that are permutations of a class.
+
+    Args:
+        farmer: Farmer with its aviaries loaded.
+        phases: Phases considered, SYMMETRIC_PHASES by default.
+
+    Returns:
+        A dict mapping avi_id to its class index, only for classes of two or more aviaries.
+    """
+    members = {}
+    for aviary in farmer.memo_aviaries.values():
+        if aviary.avi_fase in phases:
+            signature = (aviary.avi_fase, aviary.avi_capacidad_ideal, aviary.disinfection_period_days)
+            members.setdefault(signature, []).append(aviary.avi_id)
+    classes = {}
+    for index, avi_ids in enumerate(avi_ids for avi_ids in members.values() if len(avi_ids) > 1):
+        for avi_id in avi_ids:
+            classes[avi_id] = index
+    return classes
@@ -0,0 +1,101 @@
+# app/services/warm_start.py
+from datetime import date, datetime
+from app.models import Farmer, FarmState
+from app.services.dynamics_kernel import DynamicsKernel
+from app.services.frontier_expander import expand_frontier, ExpansionSettings
+
+
+def plan_record(initial_date, projection_time: int, day_actions: list, max_production) -> dict:
+    """
+    JSON-serializable record of an optimal plan, the seed of later warm-started runs.
+
+    Args:
+        initial_date: Date of time step 1.
+        projection_time: The final time step of the plan.
+        day_actions: System state applied on every time step, as returned by replay_plan.
+        max_production: Production of the plan.
+
+    Returns:
+        A dict with the initial date, horizon, production and one [aviary_id, lote_id, action]
+        list per aviary and day.
+    """
+    return {
+        "initial_date": initial_date.isoformat(),
+        "projection_time": projection_time,
+        "max_production": max_production,
+        "actions": [[[aviary_id, lote_id, action] for (_, aviary_id, lote_id, action) in system_state]
+                    for system_state in day_actions],
+    }
+
+
+def _offset(plan: dict, initial_date) -> int:
+    """Days between the start of a previous plan and initial_date"""
+    prior_date = plan["initial_date"]
+    if not isinstance(prior_date, date):
+        prior_date = datetime.strptime(prior_date, '%Y-%m-%d').date()
+    return (initial_date - prior_date).days
+
+
+def frozen_decisions(plan: dict, initial_date, projection_time: int, replan_days: int) -> dict:
+    """
+    Decisions of a previous plan to keep in a repair run, aligned on calendar dates.
+
+    The first replan_days time steps, where the new starting state matters most, and the
+    ones past the previous horizon are left free, every other step maps to the previous
+    decision of the same date as a tuple of (aviary_id, lote_id, action) entries that
+    aviaries follow wherever they are still offered.
+    """
+    offset = _offset(plan, initial_date)
+    actions = plan["actions"]
+    return {
+        day: tuple(tuple(entry) for entry in actions[day - 1 + offset])
+        for day in range(replan_days + 1, projection_time + 1)
+        if 0 <= day - 1 + offset < len(actions)
+    }
+
+
+def seed_from_plan(farmer: Farmer, kernel: DynamicsKernel, initial_state: FarmState, plan: dict,
+                   settings: ExpansionSettings) -> tuple[list, int, int]:
+    """
+    Replays a previous plan on the current initial state to get a complete feasible plan.
+
+    The previous plan is aligned on calendar dates, so a run starting d days later follows
+    it from its day d + 1. Every aviary repeats its previous action when it is still offered
+    (see follow_decision), and the best successor of the day is taken among those.
+
+    Args:
+        farmer: Working Farmer, its state is overwritten.
+        kernel: DynamicsKernel used to advance each day.
+        initial_state: FarmState before the first simulated day of the new run.
+        plan: A plan_record of a previous run.
+        settings: ExpansionSettings of the new run, days are always stepped one by one.
+
+    Returns:
+        A tuple (path, incumbent, followed_days) where path holds one (t, state_key,
+        production, farm_state, system_state) per time step 1..projection_time, incumbent is
+        the production of the whole path and followed_days how many days kept the previous
+        decision.
+    """
+    offset = _offset(plan, settings.initial_date)
+    actions = plan["actions"]
+    daily = settings._replace(step_mode="daily", frozen=None)
+
+    path = []
+    state_key, production, farm_state = tuple(), 0, initial_state
+    followed_days = 0
+    for t in range(settings.projection_time):
+        prior_day = t + offset
+        if 0 <= prior_day < len(actions):
+            # Restrict the day to the previous decision, aviary by aviary, then take the best successor
+            frozen = {t + 1: tuple(tuple(entry) for entry in actions[prior_day])}
+            day_settings = daily._replace(frozen=frozen)
+        else:
+            frozen, day_settings = None, daily
+        successors = expand_frontier(farmer, kernel, [(state_key, production, farm_state)], t, day_settings)
+        if not successors:
+            raise ValueError(f"Warm start found no feasible decision at t={t + 1}")
+        _, production, farm_state, system_state, _, state_key = max(successors, key=lambda successor: successor[1])
+        if frozen is not None and tuple(entry[1:] for entry in system_state) == frozen[t + 1]:
+            followed_days += 1
+        path.append((t + 1, state_key, production, farm_state, system_state))
+    return path, production, followed_days
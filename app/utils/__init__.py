@@ -1 +1,6 @@
-from .database import get_connection
\ No newline at end of file
+from .database import get_connection, get_pool, configure_pool, db_seconds, ConnectionPool, PoolTimeout
+from .padron_cache import PadronCache
+from .lote_allocator import LoteAllocator
+from .result_cache import ResultCache
+from .logging_setup import configure_logging, run_trace
+from .metrics import RunMetrics, MetricsRegistry
@@ -1,8 +1,62 @@
-import pyodbc
-from config import DB_CONFIG
+import logging
+import os
+import sqlite3
+import time
+from collections import deque
+from threading import Condition, Lock, local
 
-def get_connection():
-    """Establish a database connection using config"""
+try:
+    import pyodbc
+except ImportError:  # Only needed by the SQL Server backend
+    pyodbc = None
+
+try:
+    from config import DB_CONFIG
+except ImportError:  # The SQLite stand-in runs without SQL Server credentials
+    DB_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+_db_time = local()  # Seconds this thread spent waiting for and holding connections
+
+
+def _setting(name, default):
+    """DB_CONFIG value, overridable by a DB_<name> environment variable"""
+    return os.environ.get(f"DB_{name}", DB_CONFIG.get(name, default))
+
+
+class PoolTimeout(TimeoutError):
+    """No connection got free within the pool timeout"""
+
+
+class _SQLiteRow(tuple):
+    """sqlite3 row readable by column name like a pyodbc.Row (row.plote_id)"""
+    __slots__ = ()
+    _columns = {}
+
+    def __getattr__(self, name):
+        try:
+            return self[self._columns[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def _sqlite_row_factory(cursor, row):
+    columns = {description[0]: i for i, description in enumerate(cursor.description)}
+    row_class = _row_classes.get(tuple(columns))
+    if row_class is None:
+        row_class = type("Row", (_SQLiteRow,), {"__slots__": (), "_columns": columns})
+        _row_classes[tuple(columns)] = row_class
+    return row_class(row)
+
+
+_row_classes = {}
+
+
+def mssql_factory(login_timeout=None):
+    """Connection factory for SQL Server through pyodbc, using DB_CONFIG"""
+    if pyodbc is None:
+        raise RuntimeError("pyodbc is not installed, use the sqlite backend instead")
     conn_str = (
         f"DRIVER={{ODBC Driver 17 for SQL Server}};"
         f"SERVER={DB_CONFIG['SERVER']};"
@@ -10,4 +64,239 @@ def get_connection():
         f"UID={DB_CONFIG['USERNAME']};"
         f"PWD={DB_CONFIG['PASSWORD']}"
     )
-    return pyodbc.connect(conn_str)
+    login_timeout = int(login_timeout or 0)
+    return lambda: pyodbc.connect(conn_str, timeout=login_timeout)
+
+
+def sqlite_factory(database=":memory:", busy_timeout=5.0):
+    """
+    Connection factory for the SQLite stand-in backend.
+
+    ":memory:" (or any name starting with "memory:") opens a shared in-memory database, alive
+    while the pool keeps one of its connections open, so every pooled connection sees the
+    same tables.
+    """
+    if database == ":memory:" or database.startswith("memory:"):
+        name = database[len("memory:"):] if database.startswith("memory:") else ""
+        target, uri = f"file:{name or 'yemaehara'}?mode=memory&cache=shared", True
+    else:
+        target, uri = database, False
+
+    def connect():
+        conn = sqlite3.connect(target, timeout=float(busy_timeout), uri=uri, check_same_thread=False,
+                               detect_types=sqlite3.PARSE_DECLTYPES)
+        conn.row_factory = _sqlite_row_factory
+        return conn
+    return connect
+
+
+class PooledConnection:
+    """
+    Connection borrowed from a ConnectionPool.
+
+    Used as `with get_connection() as conn:` it commits on success, rolls back on error and
+    gives the connection back to the pool. Outside a with block call close() to give it back.
+    """
+    def __init__(self, pool, conn, requested_at=None):
+        self._pool = pool
+        self._conn = conn
+        self._borrowed_at = time.perf_counter() if requested_at is None else requested_at
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise RuntimeError("Connection already returned to the pool")
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        broken = False
+        try:
+            if exc_type is None:
+                self._conn.commit()
+            else:
+                self._conn.rollback()
+        except Exception:
+            broken = True
+        self._release(broken)
+
+    def close(self):
+        self._release(False)
+
+    def _release(self, broken):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn, broken)
+            _db_time.seconds = db_seconds() + time.perf_counter() - self._borrowed_at
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of database connections.
+
+    Hands out up to `size` connections, waits up to `timeout` seconds for one to get free and
+    checks a connection with `health_query` when it sat idle for more than `health_check_after`
+    seconds, replacing it when the check fails.
+    """
+    def __init__(self, factory, size=5, timeout=30.0, health_check_after=30.0, health_query="SELECT 1"):
+        self.factory = factory
+        self.size = int(size)
+        self.timeout = float(timeout)
+        self.health_check_after = float(health_check_after)
+        self.health_query = health_query
+        self._idle = deque()  # (connection, returned_at), most recent last
+        self._in_use = 0
+        self._condition = Condition()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def _healthy(self, conn, returned_at):
+        if time.monotonic() - returned_at < self.health_check_after:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.health_query)
+            cursor.fetchall()
+            return True
+        except Exception as e:
+            logger.warning("Discarding unhealthy pooled connection: %s", e)
+            return False
+
+    def _discard(self, conn):
+        self.discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """Borrow a connection, raising PoolTimeout when none got free in time"""
+        timeout = self.timeout if timeout is None else timeout
+        requested_at = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._condition:
+                while not self._idle and self._in_use >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        raise PoolTimeout(f"No database connection free after {timeout}s (pool size {self.size})")
+                idle = self._idle.pop() if self._idle else None
+                self._in_use += 1  # Reserve the slot, checks and logins happen outside the lock
+            if idle is None:
+                break
+            conn, returned_at = idle
+            if self._healthy(conn, returned_at):
+                self.reused += 1
+                return PooledConnection(self, conn, requested_at)
+            self.release(conn, broken=True)
+        try:
+            conn = self.factory()
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+        self.created += 1
+        return PooledConnection(self, conn, requested_at)
+
+    def release(self, conn, broken=False):
+        """Give a connection back, closing it instead when it is broken"""
+        with self._condition:
+            self._in_use -= 1
+            if broken:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def close(self):
+        """Close every idle connection, borrowed ones are closed when given back broken or left to the caller"""
+        with self._condition:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def stats(self):
+        with self._condition:
+            return {"size": self.size, "in_use": self._in_use, "idle": len(self._idle),
+                    "created": self.created, "reused": self.reused, "discarded": self.discarded}
+
+
+_pool = None
+_pool_lock = Lock()
+
+
+def _build_pool(backend=None, database=None, size=None, timeout=None, health_check_after=None, login_timeout=None):
+    backend = backend or _setting("BACKEND", "mssql")
+    if backend == "sqlite":
+        factory = sqlite_factory(database or _setting("SQLITE_PATH", ":memory:"))
+    elif backend == "mssql":
+        factory = mssql_factory(login_timeout if login_timeout is not None else _setting("LOGIN_TIMEOUT", 0))
+    else:
+        raise ValueError(f"Unknown database backend {backend}")
+    return ConnectionPool(
+        factory,
+        size=size if size is not None else _setting("POOL_SIZE", 5),
+        timeout=timeout if timeout is not None else _setting("POOL_TIMEOUT", 30),
+        health_check_after=health_check_after if health_check_after is not None else _setting("POOL_HEALTH_CHECK_AFTER", 30),
+    )
+
+
+def configure_pool(backend=None, database=None, size=None, timeout=None, health_check_after=None, login_timeout=None):
+    """
+    Replace the process-wide pool, by default from DB_CONFIG and DB_* environment variables.
+
+    Args:
+        backend: "mssql" (pyodbc, default) or "sqlite".
+        database: SQLite file path or ":memory:" for the sqlite backend.
+        size: Maximum number of open connections.
+        timeout: Seconds to wait for a free connection.
+        health_check_after: Idle seconds after which a connection is checked before reuse.
+        login_timeout: Seconds allowed to open a SQL Server connection, 0 for the driver default.
+
+    Returns:
+        The new ConnectionPool.
+    """
+    global _pool
+    pool = _build_pool(backend, database, size, timeout, health_check_after, login_timeout)
+    with _pool_lock:
+        previous, _pool = _pool, pool
+    if previous is not None:
+        previous.close()
+    return pool
+
+
+def get_pool():
+    """Process-wide ConnectionPool, configured on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _build_pool()
+        return _pool
+
+
+def _reset_pool_after_fork():
+    # Connections must not be shared with forked worker processes, they open their own. The
+    # lock may have been held by another thread at fork time, it would never be released
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+def get_connection(timeout=None):
+    """Borrow a pooled database connection, use it as `with get_connection() as conn:`"""
+    return get_pool().acquire(timeout)
+
+
+def db_seconds():
+    """Seconds the current thread has spent waiting for and holding pooled connections"""
+    return getattr(_db_time, "seconds", 0.0)
@@ -0,0 +1,111 @@
+# app/utils/logging_setup.py
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+APP_LOGGER = "app"
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [run %(run_id)s] %(message)s"
+
+_context = threading.local()
+_trace_lock = threading.Lock()
+_active_traces = 0
+_configured_level = logging.INFO
+
+
+class RunContextFilter(logging.Filter):
+    """Adds the run_id of the current thread to every record, "-" outside a run"""
+    def filter(self, record):
+        record.run_id = getattr(_context, "run_id", None) or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log pipelines"""
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "run_id": getattr(record, "run_id", "-"),
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _RunFilter(logging.Filter):
+    def __init__(self, run_id):
+        super().__init__()
+        self.run_id = run_id
+
+    def filter(self, record):
+        return getattr(record, "run_id", None) == self.run_id
+
+
+def configure_logging(level=None, fmt=None):
+    """
+    Sets up the "app" logger hierarchy, every module logs through logging.getLogger(__name__).
+
+    Args:
+        level: Level name or number, LOG_LEVEL environment variable by default (INFO).
+            Per-day and per-state messages are DEBUG and cost one level check when disabled.
+        fmt: "text" or "json", LOG_FORMAT environment variable by default (text).
+    """
+    global _configured_level
+    level = level or os.environ.get("LOG_LEVEL", "INFO")
+    fmt = fmt or os.environ.get("LOG_FORMAT", "text")
+    _configured_level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+    logger = logging.getLogger(APP_LOGGER)
+    for handler in [handler for handler in logger.handlers if getattr(handler, "_app_console", False)]:
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler()
+    handler._app_console = True
+    handler.setLevel(_configured_level)
+    handler.addFilter(RunContextFilter())
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    logger.addHandler(handler)
+    logger.propagate = False
+    with _trace_lock:
+        logger.setLevel(logging.DEBUG if _active_traces else _configured_level)
+    return logger
+
+
+@contextmanager
+def run_trace(run_id, path=None):
+    """
+    Tags the records of the current thread with run_id and, when path is given, writes every
+    DEBUG message of this run to that file.
+
+    While a trace is open the "app" loggers run at DEBUG, the console keeps its own level.
+    """
+    previous = getattr(_context, "run_id", None)
+    _context.run_id = run_id
+    handler = None
+    logger = logging.getLogger(APP_LOGGER)
+    if path:
+        global _active_traces
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        handler = logging.FileHandler(path)
+        handler.setLevel(logging.DEBUG)
+        handler.addFilter(RunContextFilter())
+        handler.addFilter(_RunFilter(run_id))
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        logger.addHandler(handler)
+        with _trace_lock:
+            _active_traces += 1
+            logger.setLevel(logging.DEBUG)
+    try:
+        yield
+    finally:
+        if handler is not None:
+            logger.removeHandler(handler)
+            handler.close()
+            with _trace_lock:
+                _active_traces -= 1
+                if not _active_traces:
+                    logger.setLevel(_configured_level)
+        _context.run_id = previous
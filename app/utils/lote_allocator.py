@@ -0,0 +1,100 @@
+# app/utils/lote_allocator.py
+import logging
+import re
+from threading import Lock
+from app.utils.database import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+class LoteAllocator:
+    """
+    Simulation-local plote_id and plote_name allocator for bought lotes.
+
+    Seeded once per request from a single query over m_prm_pro_lotes, it hands out virtual
+    IDs and names in memory: the n-th lote bought along a plan gets base_id + n and the n-th
+    name after the highest "a+b" name, so equivalent branches get the same IDs. Virtual IDs
+    only become real rows through resolve(), when a plan is committed.
+    """
+    def __init__(self):
+        self.base_id = None
+        self.name_addend = None
+        self._lock = Lock()
+
+    def __deepcopy__(self, memo):
+        # Shared like the PadronCache, cloned farmers keep allocating from the same seed
+        return self
+
+    @staticmethod
+    def _scan(rows):
+        """Next plote_id and last name addend from (plote_id, plote_name) rows, same rules as the original per-buy queries"""
+        max_id = None
+        max_sum = 0
+        max_addends = (0, 0)
+        for plote_id, plote_name in rows:
+            if plote_id is not None and (max_id is None or plote_id > max_id):
+                max_id = plote_id
+            numbers = list(map(int, re.findall(r'\d+', plote_name or "")))
+            if len(numbers) == 2 and sum(numbers) > max_sum:
+                max_sum = sum(numbers)
+                max_addends = tuple(numbers)
+        return (max_id + 1) if max_id is not None else 1, max_addends[1]
+
+    @staticmethod
+    def _fetch_rows():
+        try:
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT plote_id, plote_name FROM m_prm_pro_lotes")
+                return [(row[0], row[1]) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Database error in seeding lote allocator: %s", e)
+            raise
+
+    def load(self):
+        """Seed the allocator with a single query, once"""
+        if self.base_id is not None:
+            return
+        self.seed_from_rows(self._fetch_rows())
+
+    def seed_from_rows(self, rows):
+        """Seed from (plote_id, plote_name) rows of every lote, fetched elsewhere"""
+        self.seed(*self._scan(rows))
+        logger.info("Lote allocator seeded: virtual plote_id from %s, names after %s", self.base_id, self.name_addend)
+
+    def seed(self, base_id, name_addend):
+        """Seed from values already read, e.g. in a worker process"""
+        with self._lock:
+            if self.base_id is None:
+                self.base_id = base_id
+                self.name_addend = name_addend
+
+    def snapshot(self):
+        """(base_id, name_addend) to seed another allocator"""
+        return self.base_id, self.name_addend
+
+    def is_virtual(self, plote_id):
+        return self.base_id is not None and plote_id is not None and plote_id >= self.base_id
+
+    def allocate(self, ordinal):
+        """(plote_id, plote_name) of the lote bought in position `ordinal` (0 for the first) of a plan"""
+        self.load()
+        addend = self.name_addend + 2 * ordinal
+        return self.base_id + ordinal, f"{addend + 1}+{addend + 2}"
+
+    def resolve(self, virtual_ids):
+        """
+        Map the virtual IDs of a committed plan to the next real rows.
+
+        Args:
+            virtual_ids: Virtual plote_ids in purchase order.
+
+        Returns:
+            {virtual_id: (plote_id, plote_name)} allocated after the rows in the database now.
+        """
+        base_id, name_addend = self._scan(self._fetch_rows())
+        mapping = {}
+        for ordinal, virtual_id in enumerate(virtual_ids):
+            addend = name_addend + 2 * ordinal
+            mapping[virtual_id] = (base_id + ordinal, f"{addend + 1}+{addend + 2}")
+        return mapping
@@ -0,0 +1,193 @@
+# app/utils/metrics.py
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock
+from app.utils.database import db_seconds
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, peak memory is then reported as None
+    resource = None
+
+# Work done while expanding a layer, measured by expand_frontier
+EXPANSION_PHASES = ("generate", "clone", "dynamics")
+STATE_COUNTERS = {
+    "states_expanded": "DP states expanded.",
+    "successors": "Successor states generated.",
+    "merged": "Successors merged into an existing state.",
+    "pruned": "States pruned by beam width or bound.",
+}
+
+
+def peak_rss_bytes():
+    """Peak resident set size over the whole life of this process, None when the platform does not report it"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Bytes on macOS, kilobytes elsewhere
+
+
+def current_rss_bytes():
+    """Resident set size of this process right now, None where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class RunMetrics:
+    """
+    Timings and counters of one optimization run.
+
+    Whole-run phases (load, warm_start, incumbent, search, replay, report) are timed with
+    phase(), along with the database time of the calling thread within each, every expanded
+    layer adds one entry to days with its frontier size, successors, merged and pruned
+    states and the seconds spent generating next states, cloning (restore, snapshot and
+    actions), advancing dynamics and merging.
+
+    Memory is the resident set size sampled when the run starts, after every phase and
+    layer and when it finishes: peak_rss_bytes is the highest sample and rss_growth_bytes
+    how far it rose above the start, so a long-lived worker reports each run on its own.
+    RSS is process-wide, runs sharing the process at the same time count each other's
+    memory. Without /proc the process lifetime peak is reported and rss_growth_bytes is None.
+    """
+    def __init__(self):
+        self.phases = defaultdict(float)
+        self.db_phases = defaultdict(float)
+        self.days = []
+        self.db_seconds = 0.0
+        self._rss_start = current_rss_bytes()
+        self.peak_rss_bytes = self._rss_start
+        self._start = time.perf_counter()
+        self.total_seconds = None
+
+    @property
+    def rss_growth_bytes(self):
+        if self._rss_start is None or self.peak_rss_bytes is None:
+            return None
+        return self.peak_rss_bytes - self._rss_start
+
+    def sample_memory(self):
+        """Raise peak_rss_bytes to the current resident set size"""
+        rss = current_rss_bytes()
+        if rss is not None and rss > (self.peak_rss_bytes or 0):
+            self.peak_rss_bytes = rss
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        db_start = db_seconds()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+            self.db_phases[name] += db_seconds() - db_start
+            self.sample_memory()
+
+    def record_day(self, t, frontier, successors, merged, pruned, seconds, timings):
+        day = {"t": t, "frontier": frontier, "successors": successors, "merged": merged, "pruned": pruned,
+               "seconds": round(seconds, 6)}
+        for name in EXPANSION_PHASES + ("merge",):
+            day[name] = round(timings.get(name, 0.0), 6)
+        self.days.append(day)
+        self.sample_memory()
+
+    def finish(self, db_seconds=0.0):
+        self.total_seconds = time.perf_counter() - self._start
+        self.db_seconds = db_seconds
+        self.sample_memory()
+        if self._rss_start is None:
+            self.peak_rss_bytes = peak_rss_bytes()
+        return self
+
+    def totals(self):
+        totals = {name: round(sum(day[name] for day in self.days), 6) for name in EXPANSION_PHASES + ("merge",)}
+        totals.update({
+            "states_expanded": sum(day["frontier"] for day in self.days),
+            "successors": sum(day["successors"] for day in self.days),
+            "merged": sum(day["merged"] for day in self.days),
+            "pruned": sum(day["pruned"] for day in self.days),
+            "max_frontier": max((day["frontier"] for day in self.days), default=0),
+        })
+        return totals
+
+    def to_dict(self):
+        search_seconds = self.phases.get("search", 0.0)
+        totals = self.totals()
+        return {
+            "total_seconds": round(self.total_seconds or 0.0, 6),
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "db_seconds": round(self.db_seconds, 6),
+            "db_phases": {name: round(seconds, 6) for name, seconds in self.db_phases.items()},
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "rss_growth_bytes": self.rss_growth_bytes,
+            "states_per_second": round(totals["successors"] / search_seconds, 1) if search_seconds else None,
+            "totals": totals,
+            "days": self.days,
+        }
+
+
+class MetricsRegistry:
+    """Process-wide aggregate of every finished run, exported in the Prometheus text format"""
+    def __init__(self, prefix="yemaehara_optimize"):
+        self.prefix = prefix
+        self._lock = Lock()
+        self.runs = defaultdict(int)  # status -> count
+        self.seconds_sum = 0.0
+        self.phase_seconds = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.db_seconds = 0.0
+        self.db_phase_seconds = defaultdict(float)
+        self.max_frontier = 0
+        self.peak_rss_bytes = None
+
+    def observe(self, metrics: RunMetrics, status="ok"):
+        totals = metrics.totals()
+        with self._lock:
+            self.runs[status] += 1
+            self.seconds_sum += metrics.total_seconds or 0.0
+            for name, seconds in metrics.phases.items():
+                self.phase_seconds[name] += seconds
+            for name in EXPANSION_PHASES + ("merge",):
+                self.phase_seconds[f"expand_{name}"] += totals[name]
+            for name in STATE_COUNTERS:
+                self.counters[name] += totals[name]
+            self.db_seconds += metrics.db_seconds
+            for name, seconds in metrics.db_phases.items():
+                self.db_phase_seconds[name] += seconds
+            self.max_frontier = max(self.max_frontier, totals["max_frontier"])
+            if metrics.peak_rss_bytes is not None:
+                self.peak_rss_bytes = max(self.peak_rss_bytes or 0, metrics.peak_rss_bytes)
+
+    def to_prometheus(self):
+        p = self.prefix
+        with self._lock:
+            lines = [f"# HELP {p}_runs_total Finished optimization runs by status.", f"# TYPE {p}_runs_total counter"]
+            lines += [f'{p}_runs_total{{status="{status}"}} {count}' for status, count in sorted(self.runs.items())]
+            lines += [f"# HELP {p}_seconds Wall time of optimization runs.", f"# TYPE {p}_seconds summary",
+                      f"{p}_seconds_sum {self.seconds_sum:.6f}", f"{p}_seconds_count {sum(self.runs.values())}"]
+            lines += [f"# HELP {p}_phase_seconds_total Seconds spent per phase.", f"# TYPE {p}_phase_seconds_total counter"]
+            lines += [f'{p}_phase_seconds_total{{phase="{name}"}} {seconds:.6f}'
+                      for name, seconds in sorted(self.phase_seconds.items())]
+            lines += [f"# HELP {p}_db_seconds_total Seconds holding database connections.",
+                      f"# TYPE {p}_db_seconds_total counter", f"{p}_db_seconds_total {self.db_seconds:.6f}"]
+            lines += [f"# HELP {p}_phase_db_seconds_total Seconds holding database connections per phase.",
+                      f"# TYPE {p}_phase_db_seconds_total counter"]
+            lines += [f'{p}_phase_db_seconds_total{{phase="{name}"}} {seconds:.6f}'
+                      for name, seconds in sorted(self.db_phase_seconds.items())]
+            for name, value in sorted(self.counters.items()):
+                lines += [f"# HELP {p}_{name}_total {STATE_COUNTERS[name]}",
+                          f"# TYPE {p}_{name}_total counter", f"{p}_{name}_total {value}"]
+            lines += [f"# HELP {p}_max_frontier Largest DP layer expanded.", f"# TYPE {p}_max_frontier gauge",
+                      f"{p}_max_frontier {self.max_frontier}"]
+            if self.peak_rss_bytes is not None:
+                lines += [f"# HELP {p}_peak_rss_bytes Highest peak resident memory of a run.",
+                          f"# TYPE {p}_peak_rss_bytes gauge", f"{p}_peak_rss_bytes {self.peak_rss_bytes}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,114 @@
+# app/utils/padron_cache.py
+import logging
+from threading import Lock
+from app.utils.database import get_connection
+from app.models.padron import PadronTable
+
+logger = logging.getLogger(__name__)
+
+
+class PadronCache:
+    """
+    Shared cache of production patterns (m_prm_padron_detalle rows) keyed by pdet_padron_id.
+
+    A single instance is meant to be loaded once per request (or per process) and shared by
+    every Lote of a Farmer, so the simulation never goes back to the database for patterns.
+    """
+    def __init__(self):
+        self._patterns = {}
+        self._tables = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __deepcopy__(self, memo):
+        # The cache is shared state, cloned farmers and lotes must keep pointing to it
+        return self
+
+    def __contains__(self, pad_id):
+        return pad_id in self._patterns
+
+    def load(self, pad_ids):
+        """Load the patterns of every pad_id not cached yet using a single query"""
+        missing = sorted({pad_id for pad_id in pad_ids if pad_id is not None} - set(self._patterns))
+        if not missing:
+            return
+        placeholders = ",".join(["?" for _ in missing])
+        query = f"""
+            SELECT pdet_padron_id, pdet_edad, pdet_productividad, pdet_pmortd
+            FROM m_prm_padron_detalle
+            WHERE pdet_padron_id IN ({placeholders})
+            ORDER BY pdet_padron_id ASC, pdet_edad ASC
+        """
+        try:
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, missing)
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.error("Database error in fetching production patterns: %s", e)
+            raise
+
+        self.add_rows(missing, rows)
+
+    def add_rows(self, pad_ids, rows):
+        """Cache (pdet_padron_id, pdet_edad, pdet_productividad, pdet_pmortd) rows fetched elsewhere, ordered by edad"""
+        patterns = {pad_id: [] for pad_id in pad_ids if pad_id is not None and pad_id not in self._patterns}
+        for row in rows:
+            if row[0] in patterns:
+                patterns[row[0]].append({
+                    "edad": row[1],
+                    "productividad": row[2],
+                    "mortalidad": row[3]
+                })
+        with self._lock:
+            for pad_id, bio_patterns in patterns.items():
+                self._patterns.setdefault(pad_id, bio_patterns)
+                logger.info("Loaded %s production patterns for plote_pad_id %s", len(bio_patterns), pad_id)
+
+    def seed(self, patterns):
+        """Fill the cache from already loaded {pad_id: bio_patterns}, e.g. in a worker process"""
+        with self._lock:
+            for pad_id, bio_patterns in patterns.items():
+                self._patterns.setdefault(pad_id, bio_patterns)
+
+    def snapshot(self):
+        """Copy of the cached {pad_id: bio_patterns}"""
+        return dict(self._patterns)
+
+    def get(self, pad_id):
+        """Return the patterns of pad_id, querying the database only on a miss"""
+        bio_patterns = self._patterns.get(pad_id)
+        if bio_patterns is not None:
+            self.hits += 1
+            return bio_patterns
+        self.misses += 1
+        self.load([pad_id])
+        return self._patterns.get(pad_id, [])
+
+    def table(self, pad_id, plote_eprod=19):
+        """Return the PadronTable of pad_id for a given eprod cutoff, compiling it once"""
+        key = (pad_id, plote_eprod)
+        padron_table = self._tables.get(key)
+        if padron_table is None:
+            padron_table = PadronTable(pad_id, self.get(pad_id), plote_eprod)
+            with self._lock:
+                padron_table = self._tables.setdefault(key, padron_table)
+        else:
+            self.hits += 1
+        return padron_table
+
+    def invalidate(self, pad_id=None):
+        """Drop one padron (or every padron when pad_id is None) so it is reloaded on next use"""
+        with self._lock:
+            if pad_id is None:
+                self._patterns.clear()
+                self._tables.clear()
+            else:
+                self._patterns.pop(pad_id, None)
+                for key in [key for key in self._tables if key[0] == pad_id]:
+                    del self._tables[key]
+
+    def stats(self):
+        """Return the hit/miss counters and the number of cached padrones"""
+        return {"hits": self.hits, "misses": self.misses, "padrones": len(self._patterns)}
@@ -0,0 +1,162 @@
+# app/utils/result_cache.py
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+# Request fields that change the optimal plan, with the defaults dp_algo applies.
+# workers and dynamics_kernel only change how fast the same plan is found, so cached
+# responses leave them out too.
+RESULT_FIELDS = {
+    "projection_time": None,
+    "initial_date": None,
+    "raza_id": 1,
+    "pad_id": 1,
+    "buy_cantidad": 60000,
+    "beam_width": None,
+    "step_mode": "daily",
+    "epoch_step": 7,
+    "warm_start": None,
+    "warm_start_mode": "repair",
+    "replan_days": 7,
+    "symmetry_reduction": True,
+    "branch_and_bound": False,
+    "decomposition": None,
+    "aviary_groups": None,
+    "rolling_window": None,
+    "rolling_step": 7,
+    "rolling_terminal_days": 364,
+}
+
+
+def rows_fingerprint(*row_sets):
+    """SHA-256 of database rows, each result set hashed in order"""
+    digest = hashlib.sha256()
+    for rows in row_sets:
+        digest.update(b"\x1e")
+        for row in rows:
+            digest.update(repr(tuple(row)).encode())
+            digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed cache of optimization responses.
+
+    Keys hash the normalized request with the fingerprint of the rows the Farmer was loaded
+    from, so a change to any aviary, lote or padron row is a miss. The memory tier is an LRU
+    bounded by entries and serialized bytes, the optional disk tier keeps one JSON file per
+    key in `directory`, trimmed to `max_disk_entries` by modification time.
+    """
+    def __init__(self, max_entries=64, max_bytes=64 * 1024 * 1024, directory=None, max_disk_entries=1000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()  # key -> (response, size)
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def normalize(data):
+        """Request fields that define the result, with defaults filled and ID lists sorted"""
+        normalized = {field: data.get(field, default) for field, default in RESULT_FIELDS.items()}
+        normalized["avi_ids"] = sorted(set(data.get("avi_ids") or []))
+        normalized["lote_ids"] = sorted(set(data.get("lote_ids") or []))
+        return normalized
+
+    @staticmethod
+    def cacheable(data):
+        """Time budgets make the result depend on the machine speed, so those runs are not cached"""
+        return data.get("time_budget") is None and data.get("use_cache", True)
+
+    def key(self, data, fingerprint):
+        payload = json.dumps({"request": self.normalize(data), "db": fingerprint}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Cached response for key, from memory first, then from disk"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(entry[0])
+        if self.directory:
+            try:
+                with open(self._path(key)) as f:
+                    serialized = f.read()
+                response = json.loads(serialized)
+            except (OSError, ValueError):
+                pass
+            else:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._store(key, serialized)
+                return response
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, response):
+        """Cache a JSON-serializable response in memory and, when enabled, on disk"""
+        serialized = json.dumps(response, default=str)
+        with self._lock:
+            self._store(key, serialized)
+        if self.directory:
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    f.write(serialized)
+                os.replace(tmp_path, path)
+                self._trim_disk()
+            except OSError as e:
+                logger.warning("Could not write result cache file %s: %s", path, e)
+
+    def _store(self, key, serialized):
+        size = len(serialized)
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        self._entries[key] = (serialized, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def _trim_disk(self):
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")]
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits,
+                    "disk_hits": self.disk_hits, "misses": self.misses}
@@ -0,0 +1,186 @@
+# benchmarks/run_benchmarks.py
+"""
+Optimizer benchmarks on synthetic farms, no SQL Server needed.
+
+Every scenario runs in a fresh process against an in-memory SQLite database filled by
+synthetic_farm, so peak RSS is its own. Results are printed as one JSON object per
+scenario (JSON Lines), or written to --output.
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --scenarios base horizon_60 --output bench.jsonl
+    python -m benchmarks.run_benchmarks --baseline bench.jsonl --tolerance 0.25
+
+With --baseline the exit status is 1 when any scenario got slower than the baseline by
+more than the tolerance, or when its max_production changed.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+INITIAL_DATE = date(2025, 1, 1)
+
+# name -> (aviaries, lotes, projection_time, extra /optimize parameters)
+SCENARIOS = {
+    "base": (6, 3, 30, {}),
+    "horizon_60": (6, 3, 60, {}),
+    "horizon_120_beam": (6, 3, 120, {"beam_width": 500}),
+    "horizon_120_event": (6, 3, 120, {"step_mode": "event"}),
+    "horizon_120_bnb": (6, 3, 120, {"branch_and_bound": True}),
+    "horizon_730_rolling": (12, 6, 730, {"rolling_window": 60, "rolling_step": 14, "beam_width": 50,
+                                         "branch_and_bound": True}),
+    "aviaries_9": (9, 5, 30, {}),
+    "aviaries_12": (12, 6, 30, {}),
+    "aviaries_24_beam": (24, 12, 60, {"beam_width": 200}),
+    "aviaries_24_blocks": (24, 12, 60, {"beam_width": 200, "decomposition": "block"}),
+    "lotes_9": (12, 9, 30, {}),
+    "aviaries_200_beam": (200, 120, 14, {"beam_width": 20}),
+}
+MICRO_REPEAT = 200
+
+
+def _micro(farmer, settings):
+    """Calls per second of generate_next_states and evaluate_dynamics from the initial state"""
+    from app.services.state_generator import generate_next_states
+    from app.services.dynamics_evaluator import evaluate_dynamics
+
+    initial_state = farmer.snapshot()
+    start = time.perf_counter()
+    for _ in range(MICRO_REPEAT):
+        farmer.restore(initial_state)
+        next_states = list(generate_next_states(farmer, 1))
+    generate_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    calls = 0
+    while calls < MICRO_REPEAT:
+        for system_state in next_states:
+            farmer.restore(initial_state)
+            evaluate_dynamics(system_state, farmer, settings["raza_id"], settings["pad_id"], settings["buy_cantidad"])
+            calls += 1
+    evaluate_seconds = time.perf_counter() - start
+    farmer.restore(initial_state)
+    return {
+        "next_states": len(next_states),
+        "generate_next_states_per_second": round(MICRO_REPEAT / generate_seconds, 1),
+        "evaluate_dynamics_per_second": round(calls / evaluate_seconds, 1),
+    }
+
+
+def run_scenario(name, seed=0):
+    """Runs one scenario in the current process and returns its JSON-serializable result"""
+    from benchmarks.synthetic_farm import generate_farm, load_farm
+    from app.models import Farmer
+    from app.services.dp_algorithm import run_optimization
+    from app.services.input_initializer import init_adjust
+    from app.utils.database import configure_pool, get_connection
+    from app.utils.logging_setup import configure_logging
+    from app.utils.metrics import peak_rss_bytes
+
+    configure_logging("WARNING")
+    n_aviaries, n_lotes, projection_time, extra = SCENARIOS[name]
+    configure_pool(backend="sqlite", database=f"memory:bench_{name}")
+    farm = generate_farm(n_aviaries, n_lotes, INITIAL_DATE, seed=seed)
+    with get_connection() as conn:
+        load_farm(conn, farm)
+
+    request = {"avi_ids": farm["avi_ids"], "lote_ids": farm["lote_ids"], "projection_time": projection_time,
+               "initial_date": INITIAL_DATE.isoformat(), "raza_id": 1, "pad_id": 1, "buy_cantidad": 60000,
+               "use_cache": False, "metrics": True, "workers": 1, **extra}
+
+    farmer = Farmer()
+    farmer.fetch_farm(farm["avi_ids"], farm["lote_ids"], [request["pad_id"]])
+    farmer.set_date(INITIAL_DATE)
+    farmer = init_adjust(farmer)
+    micro = _micro(farmer, request)
+
+    start = time.perf_counter()
+    response, status = run_optimization(request)
+    wall_seconds = time.perf_counter() - start
+    if status != 200:
+        raise RuntimeError(f"Scenario {name} failed with {status}: {response.get('error')}")
+    metrics = response["metrics"]
+    totals = metrics["totals"]
+    return {
+        "scenario": name,
+        "aviaries": n_aviaries,
+        "lotes": n_lotes,
+        "projection_time": projection_time,
+        "params": extra,
+        "seed": seed,
+        "wall_seconds": round(wall_seconds, 4),
+        "states_expanded": totals["states_expanded"],
+        "successors": totals["successors"],
+        "states_per_second": round(totals["successors"] / wall_seconds, 1) if wall_seconds else None,
+        "max_frontier": totals["max_frontier"],
+        "phases": metrics["phases"],
+        "db_phases": metrics["db_phases"],
+        "peak_rss_bytes": peak_rss_bytes(),  # The process only ran this scenario, see run_isolated
+        "rss_growth_bytes": metrics["rss_growth_bytes"],
+        "max_production": response["max_production"],
+        "micro": micro,
+    }
+
+
+def run_isolated(name, seed=0):
+    """Runs a scenario in a fresh spawned process so imports, caches and peak RSS start clean"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_scenario, name, seed).result()
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of results against baseline results, as human-readable strings"""
+    previous = {entry["scenario"]: entry for entry in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if before is None:
+            continue
+        if result["max_production"] != before["max_production"]:
+            regressions.append(f"{result['scenario']}: max_production {before['max_production']} -> {result['max_production']}")
+        if result["wall_seconds"] > before["wall_seconds"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: wall_seconds {before['wall_seconds']} -> {result['wall_seconds']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the optimizer on synthetic farms")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic farms")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario, the fastest is kept")
+    parser.add_argument("--output", help="JSON Lines file to write, stdout by default")
+    parser.add_argument("--baseline", help="JSON Lines results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed wall time increase over the baseline")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.scenarios:
+        runs = [run_isolated(name, args.seed) for _ in range(max(1, args.repeat))]
+        result = min(runs, key=lambda run: run["wall_seconds"])
+        results.append(result)
+        print(f"{name}: {result['wall_seconds']}s, {result['states_per_second']} states/s", file=sys.stderr)
+
+    lines = "".join(json.dumps(result, sort_keys=True) + "\n" for result in results)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(lines)
+    else:
+        sys.stdout.write(lines)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = [json.loads(line) for line in f if line.strip()]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    sys.exit(main())
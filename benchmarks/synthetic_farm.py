@@ -0,0 +1,141 @@
+# benchmarks/synthetic_farm.py
+import math
+import random
+from datetime import timedelta
+
+PHASE_SHARES = (("recria", 0.35), ("produccion", 0.45), ("predescarte", 0.2))
+PHASE_AGE_WEEKS = {"recria": (8, 18), "produccion": (20, 72), "predescarte": (70, 95)}
+CAPACITIES = {"recria": (60000, 70000, 80000), "produccion": (50000, 60000, 70000, 80000),
+              "predescarte": (50000, 60000, 70000, 80000)}
+PLOTE_EPROD = 19
+PADRON_WEEKS = 110
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS m_prm_aviarios (
+        avi_id INTEGER PRIMARY KEY, avi_name TEXT, avi_blo_id INTEGER, avi_capacidad_ideal INTEGER,
+        avi_desf_est INTEGER, avi_recria INTEGER, avi_produccion INTEGER, avi_predescarte INTEGER)""",
+    """CREATE TABLE IF NOT EXISTS m_prm_pro_lotes (
+        plote_id INTEGER PRIMARY KEY, plote_name TEXT, plote_raza_id INTEGER, plote_pad_id INTEGER,
+        id_escenario INTEGER, plote_eprod INTEGER, plote_fnac_a DATE, plote_fnac_b DATE, plote_fprod DATE,
+        plote_avi_id INTEGER, plote_cantidad INTEGER, plote_cvtadia INTEGER)""",
+    """CREATE TABLE IF NOT EXISTS m_prm_padron_detalle (
+        pdet_padron_id INTEGER, pdet_edad INTEGER, pdet_productividad REAL, pdet_pmortd REAL)""",
+)
+
+
+def padron_curve(peak=94.0, peak_week=27, decline_per_week=0.35, base_mortality=0.00012):
+    """
+    Weekly (edad, productividad, pmortd) rows of a laying hen standard, productividad in percent.
+
+    Production is zero before PLOTE_EPROD, climbs to peak by peak_week, then declines
+    linearly. Daily mortality is higher in the first weeks and rises again with age.
+    """
+    rows = []
+    for week in range(PADRON_WEEKS):
+        if week < PLOTE_EPROD - 1:
+            productividad = 0.0
+        elif week < peak_week:
+            productividad = peak * (1 - math.exp(-(week - PLOTE_EPROD + 2) / 2.5))
+        else:
+            productividad = max(0.0, peak - decline_per_week * (week - peak_week))
+        pmortd = base_mortality * (1 + 3 * math.exp(-week / 3) + max(0, week - 60) / 40)
+        rows.append((week, round(productividad, 2), round(pmortd, 6)))
+    return rows
+
+
+def _phase_counts(n_aviaries):
+    counts = [max(1, int(n_aviaries * share)) for _, share in PHASE_SHARES]
+    counts[1] += n_aviaries - sum(counts)  # Rounding goes to produccion
+    if counts[1] < 1:
+        raise ValueError(f"At least {len(PHASE_SHARES)} aviaries are needed, one per phase")
+    return {phase: count for (phase, _), count in zip(PHASE_SHARES, counts)}
+
+
+def generate_farm(n_aviaries, n_lotes, initial_date, seed=0, block_size=6, padrones=2, dirty_share=0.1):
+    """
+    Builds the rows of a synthetic farm.
+
+    Args:
+        n_aviaries: Aviaries split across recria, produccion and predescarte (35/45/20),
+            recria ones big enough to receive bought lotes.
+        n_lotes: Lotes placed in distinct aviaries, taking the phases in turn so each
+            keeps empty aviaries, at ages matching the aviary phase. Must not exceed n_aviaries.
+        initial_date: Date the optimization starts, lote birth dates are set back from it.
+        seed: Seed of the random generator, the same arguments always give the same farm.
+        block_size: Aviaries per avi_blo_id, blocks take the aviaries of each phase in turn
+            so every block holds every phase when there are enough aviaries.
+        padrones: Number of padron curves, lotes pick one at random.
+        dirty_share: Share of the empty aviaries flagged as needing disinfection.
+
+    Returns:
+        A dict with "aviaries", "lotes" and "padron_detalle" row lists, in the column order
+        of SCHEMA, and the "avi_ids", "lote_ids" and "pad_ids" to request.
+    """
+    if n_lotes > n_aviaries:
+        raise ValueError("Every lote needs its own aviary, n_lotes must not exceed n_aviaries")
+    rng = random.Random(seed)
+    aviaries = []
+    avi_id = 1
+    blocks = -(-n_aviaries // block_size)
+    for phase, count in _phase_counts(n_aviaries).items():
+        for i in range(count):
+            aviaries.append([avi_id, f"{phase[0].upper()}{i + 1}", i % blocks + 1, rng.choice(CAPACITIES[phase]),
+                             0, int(phase == "recria"), int(phase == "produccion"), int(phase == "predescarte")])
+            avi_id += 1
+
+    pad_ids = list(range(1, padrones + 1))
+    padron_detalle = []
+    for pad_id in pad_ids:
+        curve = padron_curve(peak=rng.uniform(90, 96), peak_week=rng.randint(25, 29),
+                             decline_per_week=rng.uniform(0.3, 0.4))
+        padron_detalle += [(pad_id, edad, productividad, pmortd) for edad, productividad, pmortd in curve]
+
+    # Phases take turns receiving a lote
+    by_phase = {}
+    for aviary in aviaries:
+        phase = "recria" if aviary[5] else "produccion" if aviary[6] else "predescarte"
+        by_phase.setdefault(phase, []).append(aviary)
+    for phase_aviaries in by_phase.values():
+        rng.shuffle(phase_aviaries)
+    occupied = []
+    turn = ["produccion", "recria", "predescarte"]
+    while len(occupied) < n_lotes:
+        phase = turn[len(occupied) % len(turn)]
+        if not by_phase.get(phase):
+            turn.remove(phase)
+            continue
+        occupied.append((by_phase[phase].pop(0), phase))
+
+    for phase_aviaries in by_phase.values():
+        for aviary in phase_aviaries:
+            aviary[4] = 1 if rng.random() < dirty_share else 0  # Only empty aviaries await disinfection
+    aviaries = [tuple(aviary) for aviary in aviaries]
+
+    lotes = []
+    for i, (aviary, phase) in enumerate(sorted(occupied), start=1):
+        weeks = rng.randint(*PHASE_AGE_WEEKS[phase])
+        fnac_a = initial_date - timedelta(days=weeks * 7 + rng.randint(0, 6))
+        cantidad = int(aviary[3] * rng.uniform(0.8, 0.95))
+        lotes.append((i, f"{2 * i - 1}+{2 * i}", 1, rng.choice(pad_ids), 1, PLOTE_EPROD, fnac_a,
+                      fnac_a + timedelta(days=7), fnac_a + timedelta(days=PLOTE_EPROD * 7), aviary[0], cantidad, 0))
+
+    return {
+        "aviaries": aviaries,
+        "lotes": lotes,
+        "padron_detalle": padron_detalle,
+        "avi_ids": [aviary[0] for aviary in aviaries],
+        "lote_ids": [lote[0] for lote in lotes],
+        "pad_ids": pad_ids,
+    }
+
+
+def load_farm(conn, farm):
+    """Creates the tables the Farmer reads and inserts a generate_farm result, replacing earlier rows"""
+    cursor = conn.cursor()
+    for statement in SCHEMA:
+        cursor.execute(statement)
+    for table in ("m_prm_aviarios", "m_prm_pro_lotes", "m_prm_padron_detalle"):
+        cursor.execute(f"DELETE FROM {table}")
+    cursor.executemany("INSERT INTO m_prm_aviarios VALUES (?, ?, ?, ?, ?, ?, ?, ?)", farm["aviaries"])
+    cursor.executemany("INSERT INTO m_prm_pro_lotes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", farm["lotes"])
+    cursor.executemany("INSERT INTO m_prm_padron_detalle VALUES (?, ?, ?, ?)", farm["padron_detalle"])